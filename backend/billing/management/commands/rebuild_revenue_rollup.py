@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from billing.services import rebuild_revenue_rollup, verify_revenue_rollup
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly revenue rollup from bookings and paid invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', help='Username of a single landlord to rebuild')
+        parser.add_argument('--verify', action='store_true', help='Only report months where the rollup is off')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['owner']}")
+
+        if options['verify']:
+            owners = [owner] if owner else User.objects.filter(properties__isnull=False).distinct()
+            mismatches = 0
+            for landlord in owners:
+                for row in verify_revenue_rollup(landlord):
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"{landlord.username} {row['year']}-{row['month']:02d}: rollup {row['rollup']} != live {row['live']}"
+                    ))
+            self.stdout.write(self.style.SUCCESS(f"Verification done, {mismatches} mismatched months."))
+            return
+
+        rows = rebuild_revenue_rollup(owner)
+        self.stdout.write(self.style.SUCCESS(f"Revenue rollup rebuilt: {rows} rows."))
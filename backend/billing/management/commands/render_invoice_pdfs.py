@@ -0,0 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from billing.models import Invoice
+from billing.pdf import render_invoice_pdfs, timing_summary, warm_up
+
+
+def _start_worker():
+    import django
+    django.setup()
+    warm_up()
+
+
+class Command(BaseCommand):
+    help = 'Renders invoice PDFs in batches, here in a warm process pool or on the PDF workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('invoice_ids', nargs='*', type=int)
+        parser.add_argument('--issued', help='Every invoice issued in a month, as YYYY-MM')
+        parser.add_argument('--processes', type=int, default=1, help='Render processes to run here')
+        parser.add_argument('--queue', action='store_true', help='Send the batches to the pdf queue instead')
+        parser.add_argument('--batch-size', type=int, default=settings.PDF_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        ids = list(options['invoice_ids'])
+        if options['issued']:
+            try:
+                year, month = (int(part) for part in options['issued'].split('-'))
+            except ValueError:
+                raise CommandError("--issued takes YYYY-MM")
+            ids += Invoice.objects.filter(issue_date__year=year, issue_date__month=month).order_by('pk').values_list('pk', flat=True)
+        if not ids:
+            raise CommandError("Give invoice ids or --issued")
+        batches = [ids[start:start + options['batch_size']] for start in range(0, len(ids), options['batch_size'])]
+
+        if options['queue']:
+            from billing.tasks import render_invoice_pdfs_task
+            for batch in batches:
+                render_invoice_pdfs_task.delay(batch)
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(ids)} invoices in {len(batches)} batches."))
+            return
+
+        if options['processes'] > 1:
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes'], initializer=_start_worker) as pool:
+                results = [result for batch in pool.map(render_invoice_pdfs, batches) for result in batch]
+        else:
+            warm_up()
+            results = [result for batch in batches for result in render_invoice_pdfs(batch)]
+
+        for result in results:
+            if result['error']:
+                self.stdout.write(self.style.WARNING(f"Invoice #{result['invoice']}: {result['error']}"))
+            else:
+                self.stdout.write(
+                    f"Invoice #{result['invoice']}: document {result['document']}, {result['bytes']} bytes, "
+                    f"render {result['render_ms']} ms, store {result['store_ms']} ms"
+                )
+        summary = timing_summary(results)
+        timings = f", mean {summary['mean_ms']} ms, p95 {summary['p95_ms']} ms, max {summary['max_ms']} ms" if summary['documents'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {summary['documents']} invoices ({summary['failed']} failed){timings}."
+        ))
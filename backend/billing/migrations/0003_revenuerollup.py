@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def backfill_revenue_rollup(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    RevenueRollup = apps.get_model('billing', 'RevenueRollup')
+    rows = Booking.objects.filter(
+        status__in=['confirmed', 'completed'], invoice__status='paid'
+    ).annotate(month=TruncMonth('start_date')).values(
+        'unit_id', 'unit__property_id', 'unit__property__owner_id', 'month'
+    ).order_by().annotate(revenue=models.Sum('invoice__amount'), paid_invoices=models.Count('id'))
+    RevenueRollup.objects.bulk_create([
+        RevenueRollup(
+            owner_id=row['unit__property__owner_id'],
+            property_id=row['unit__property_id'],
+            unit_id=row['unit_id'],
+            month=row['month'],
+            revenue=row['revenue'],
+            paid_invoices=row['paid_invoices'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('properties', '0003_remove_property_base_price_remove_property_features_and_more'),
+        ('billing', '0002_invoice_payout_status_transaction'),
+        ('bookings', '0006_pricingrule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('overdue', 'Overdue'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], default='pending', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_invoices', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to=settings.AUTH_USER_MODEL)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='properties.property')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='properties.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'month'], name='revenue_owner_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('owner', 'property', 'unit', 'month'), name='unique_revenue_rollup'),
+        ),
+        migrations.RunPython(backfill_revenue_rollup, migrations.RunPython.noop),
+    ]
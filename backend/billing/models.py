@@ -1,12 +1,15 @@
 from django.db import models
+from common.models import ChangeTrackingMixin
 
-class Invoice(models.Model):
+class Invoice(ChangeTrackingMixin, models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('paid', 'Paid'),
         ('overdue', 'Overdue'),
         ('cancelled', 'Cancelled'),
+        ('refunded', 'Refunded'),
     )
+    tracked_fields = ('status', 'amount')
 
     booking = models.OneToOneField('bookings.Booking', on_delete=models.CASCADE, related_name='invoice')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -25,6 +28,12 @@ class Invoice(models.Model):
 
     class Meta:
         verbose_name_plural = "Invoices"
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['-created_at', '-id'], name='invoice_created_idx'),
+            # Overdue sweep: only pending invoices are ever scanned by due date
+            models.Index(fields=['due_date'], condition=models.Q(status='pending'), name='invoice_pending_due_idx'),
+        ]
 
     def __str__(self):
         return f"Invoice for Booking {self.booking.id} - {self.amount}"
@@ -47,5 +56,37 @@ class Transaction(models.Model):
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, overall and per user ledger
+            models.Index(fields=['-created_at', '-id'], name='transaction_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type.upper()} - {self.amount}"
+
+
+class RevenueRollup(models.Model):
+    """
+    Paid revenue per owner, property, unit and month (of the booking's start date).
+    Maintained transactionally by billing signals; rebuild with `manage.py rebuild_revenue_rollup`.
+    """
+    owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='revenue_rollups')
+    property = models.ForeignKey('properties.Property', on_delete=models.CASCADE, related_name='revenue_rollups')
+    unit = models.ForeignKey('properties.Unit', on_delete=models.CASCADE, related_name='revenue_rollups')
+    month = models.DateField() # First day of the month
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_invoices = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'property', 'unit', 'month'], name='unique_revenue_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'month'], name='revenue_owner_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.unit_id} {self.month:%Y-%m}: {self.revenue}"
@@ -0,0 +1,116 @@
+"""
+Invoice PDF rendering.
+
+Renders run on the dedicated 'pdf' Celery queue (CELERY_TASK_ROUTES), consumed by its own
+worker pool, so month-end runs never sit in front of email. Every worker process parses the
+invoice stylesheet and sets up fonts once and keeps them for its lifetime; per invoice only
+the template render and the layout remain. Batches load their invoices and vault documents
+up front and report how long each document took.
+"""
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.template.loader import get_template
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+TEMPLATE = 'billing/invoice_pdf.html'
+STYLESHEET = Path(__file__).resolve().parent / 'templates' / 'billing' / 'invoice_pdf.css'
+
+
+@lru_cache(maxsize=None)
+def _resources():
+    """(template, stylesheet, font configuration), built once per process."""
+    font_config = FontConfiguration()
+    return get_template(TEMPLATE), CSS(filename=str(STYLESHEET), font_config=font_config), font_config
+
+
+def warm_up():
+    """Parses the stylesheet and loads its fonts by laying out a throwaway page."""
+    _, stylesheet, font_config = _resources()
+    HTML(string='<h3>Invoice</h3><div class="logo">0</div>').write_pdf(stylesheets=[stylesheet], font_config=font_config)
+
+
+def render_invoice_pdf(invoice):
+    template, stylesheet, font_config = _resources()
+    html = template.render({
+        'invoice': invoice,
+        'unit': invoice.booking.unit,
+        'property': invoice.booking.unit.property,
+        'tenant': invoice.booking.tenant,
+    })
+    return HTML(string=html).write_pdf(stylesheets=[stylesheet], font_config=font_config)
+
+
+def invoice_document_title(invoice):
+    return f"Invoice_{invoice.id}_{invoice.booking.tenant.username}"
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def render_invoice_pdfs(invoice_ids):
+    """
+    Renders a batch of invoices into the Document Vault. Re-renders replace the invoice's
+    existing document. Returns one entry per id, in order:
+    {'invoice', 'document', 'bytes', 'render_ms', 'store_ms', 'error'}.
+    """
+    from properties.models import Document
+    from .models import Invoice
+
+    invoices = Invoice.objects.select_related('booking__unit__property', 'booking__tenant').in_bulk(invoice_ids)
+    documents = {
+        (doc.unit_id, doc.title): doc
+        for doc in Document.objects.filter(
+            unit__in={invoice.booking.unit_id for invoice in invoices.values()},
+            title__in=[invoice_document_title(invoice) for invoice in invoices.values()],
+        )
+    }
+
+    results = []
+    for invoice_id in invoice_ids:
+        result = {'invoice': invoice_id, 'document': None, 'bytes': None, 'render_ms': None, 'store_ms': None, 'error': None}
+        results.append(result)
+        invoice = invoices.get(invoice_id)
+        if invoice is None:
+            result['error'] = "Invoice does not exist."
+            continue
+
+        unit, title = invoice.booking.unit, invoice_document_title(invoice)
+        doc = documents.get((unit.id, title)) or Document(
+            unit=unit,
+            property=unit.property,
+            title=title,
+            category='lease',  # Reusing lease for financial docs or add 'invoice'
+        )
+        started = time.perf_counter()
+        try:
+            pdf = render_invoice_pdf(invoice)
+            rendered = time.perf_counter()
+            # Identical PDFs share one stored blob
+            doc.file.save(f"invoice_{invoice.id}.pdf", ContentFile(pdf))
+        except Exception as e:
+            print(f"PDF Generation Error: {e}")
+            result['error'] = str(e)
+            continue
+        result.update(
+            document=doc.id, bytes=len(pdf),
+            render_ms=_ms(rendered - started), store_ms=_ms(time.perf_counter() - rendered),
+        )
+    return results
+
+
+def timing_summary(results):
+    """Count, failures and mean / p95 / max render time over a list of render_invoice_pdfs results."""
+    timings = sorted(result['render_ms'] for result in results if result['render_ms'] is not None)
+    summary = {'documents': len(timings), 'failed': len(results) - len(timings)}
+    if timings:
+        summary.update(
+            mean_ms=round(sum(timings) / len(timings), 1),
+            p95_ms=timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            max_ms=timings[-1],
+        )
+    return summary
@@ -1,8 +1,14 @@
 from rest_framework import serializers
-from .models import Invoice
+from .models import Invoice, Transaction
 
 class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Invoice
         fields = ['id', 'booking', 'amount', 'issue_date', 'due_date', 'status', 'payout_status', 'created_at', 'updated_at']
         read_only_fields = ['id', 'booking', 'amount', 'issue_date', 'payout_status', 'created_at', 'updated_at']
+
+class TransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = ['id', 'invoice', 'user', 'amount', 'transaction_type', 'description', 'is_verified', 'created_at']
+        read_only_fields = fields
@@ -1,41 +1,161 @@
-from django.template.loader import render_to_string
-from weasyprint import HTML
-from django.core.files.base import ContentFile
-from .models import Invoice
-from properties.models import Document
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum, Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from decimal import Decimal
+from .models import Invoice, RevenueRollup, Transaction
+from properties.models import Document, Unit
+
+# Booking statuses whose paid invoices count as revenue
+REVENUE_BOOKING_STATUSES = ('confirmed', 'completed')
 
 def generate_invoice_pdf(invoice_id):
     """
     Generates a professional PDF using WeasyPrint and saves it to the Document Vault.
     """
-    try:
-        invoice = Invoice.objects.select_related('booking__unit__property', 'booking__tenant').get(id=invoice_id)
-        
-        # Context for the template
-        context = {
-            'invoice': invoice,
-            'unit': invoice.booking.unit,
-            'property': invoice.booking.unit.property,
-            'tenant': invoice.booking.tenant,
-        }
-        
-        # Render HTML to string
-        # Note: We need to create this template
-        html_string = render_to_string('billing/invoice_pdf.html', context)
-        
-        # Generate PDF
-        pdf_file = HTML(string=html_string).write_pdf()
-        
-        # Save to Document Vault
-        doc = Document.objects.create(
-            unit=invoice.booking.unit,
-            property=invoice.booking.unit.property,
-            title=f"Invoice_{invoice.id}_{invoice.booking.tenant.username}",
-            category='lease', # Reusing lease for financial docs or add 'invoice'
-        )
-        doc.file.save(f"invoice_{invoice.id}.pdf", ContentFile(pdf_file))
-        
-        return doc.file.url
-    except Exception as e:
-        print(f"PDF Generation Error: {e}")
+    from .pdf import render_invoice_pdfs
+
+    result, = render_invoice_pdfs([invoice_id])
+    if result['error']:
         return None
+    return Document.objects.get(pk=result['document']).file.url
+
+
+def record_revenue(unit_id, start_date, amount, paid_invoices):
+    """Adds (or with negative values, removes) paid revenue in the rollup row of the unit and month."""
+    owner_id, property_id = Unit.objects.filter(pk=unit_id).values_list('property__owner_id', 'property_id').get()
+    key = {'owner_id': owner_id, 'property_id': property_id, 'unit_id': unit_id, 'month': start_date.replace(day=1)}
+    amount = Decimal(str(amount))
+
+    with transaction.atomic():
+        updated = RevenueRollup.objects.filter(**key).update(
+            revenue=F('revenue') + amount,
+            paid_invoices=F('paid_invoices') + paid_invoices
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                RevenueRollup.objects.create(revenue=amount, paid_invoices=paid_invoices, **key)
+        except IntegrityError:
+            # Created concurrently by another transaction
+            RevenueRollup.objects.filter(**key).update(
+                revenue=F('revenue') + amount,
+                paid_invoices=F('paid_invoices') + paid_invoices
+            )
+
+def live_monthly_revenue(owner):
+    """The full-history aggregate the rollup replaces; used for verification and rebuilds."""
+    from bookings.models import Booking
+    return Booking.objects.filter(
+        unit__property__owner=owner,
+        status__in=REVENUE_BOOKING_STATUSES,
+        invoice__status='paid'
+    ).annotate(
+        year=ExtractYear('start_date'),
+        month=ExtractMonth('start_date')
+    ).values('year', 'month').order_by('year', 'month').annotate(
+        total_revenue=Sum('invoice__amount')
+    )
+
+def rollup_monthly_revenue(owner):
+    rows = RevenueRollup.objects.filter(owner=owner).values('month').order_by('month').annotate(
+        total_revenue=Sum('revenue')
+    )
+    return [
+        {'year': row['month'].year, 'month': row['month'].month, 'total_revenue': row['total_revenue']}
+        for row in rows if row['total_revenue']
+    ]
+
+def verify_revenue_rollup(owner):
+    """Months where the rollup and the live aggregate disagree."""
+    live = {(row['year'], row['month']): row['total_revenue'] for row in live_monthly_revenue(owner)}
+    rolled = {(row['year'], row['month']): row['total_revenue'] for row in rollup_monthly_revenue(owner)}
+    return [
+        {'year': year, 'month': month, 'rollup': rolled.get((year, month), 0), 'live': live.get((year, month), 0)}
+        for year, month in sorted(set(live) | set(rolled))
+        if rolled.get((year, month), 0) != live.get((year, month), 0)
+    ]
+
+@transaction.atomic
+def rebuild_revenue_rollup(owner=None):
+    """Recomputes the rollup from bookings and paid invoices. Returns the number of rows written."""
+    from bookings.models import Booking
+    from django.db.models.functions import TruncMonth
+
+    rollups = RevenueRollup.objects.all()
+    bookings = Booking.objects.filter(status__in=REVENUE_BOOKING_STATUSES, invoice__status='paid')
+    if owner is not None:
+        rollups = rollups.filter(owner=owner)
+        bookings = bookings.filter(unit__property__owner=owner)
+    rollups.delete()
+
+    rows = bookings.annotate(month=TruncMonth('start_date')).values(
+        'unit_id', 'unit__property_id', 'unit__property__owner_id', 'month'
+    ).order_by().annotate(revenue=Sum('invoice__amount'), paid_invoices=Count('id'))
+
+    created = RevenueRollup.objects.bulk_create([
+        RevenueRollup(
+            owner_id=row['unit__property__owner_id'],
+            property_id=row['unit__property_id'],
+            unit_id=row['unit_id'],
+            month=row['month'],
+            revenue=row['revenue'],
+            paid_invoices=row['paid_invoices'],
+        )
+        for row in rows
+    ], batch_size=1000)
+    return len(created)
+
+
+def record_stay_payouts(booking_ids):
+    """
+    Pays landlords out for the paid invoices of completed stays: one bulk insert of payout
+    transactions, and each invoice is paid out at most once. Returns the number of payouts.
+    """
+    with transaction.atomic():
+        invoices = list(
+            Invoice.objects.select_for_update(of=('self',)).filter(
+                booking_id__in=booking_ids, booking__status='completed', status='paid', payout_status='pending'
+            ).values_list('pk', 'amount', 'booking__unit__property__owner_id', 'booking__unit__unit_number')
+        )
+        Transaction.objects.bulk_create([
+            Transaction(
+                invoice_id=invoice_id,
+                user_id=owner_id,
+                amount=amount,
+                transaction_type='payout',
+                description=f"Earnings for {unit_number}",
+                is_verified=True
+            )
+            for invoice_id, amount, owner_id, unit_number in invoices
+        ])
+        Invoice.objects.filter(pk__in=[invoice[0] for invoice in invoices]).update(
+            payout_status='processed', updated_at=timezone.now()
+        )
+    return len(invoices)
+
+
+def mark_overdue_invoices(today=None, batch_size=500):
+    """
+    Moves pending invoices past their due date to 'overdue' with one UPDATE per batch.
+    Signals are skipped on purpose (only paid invoices feed the revenue rollup); each batch's
+    notifications are enqueued as a single task once it commits. Returns the number marked.
+    """
+    from .tasks import notify_overdue_invoices_task
+
+    today = today or timezone.localdate()
+    marked = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Invoice.objects.filter(status='pending', due_date__lt=today)
+                .order_by('due_date').select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if ids:
+                Invoice.objects.filter(pk__in=ids).update(status='overdue', updated_at=timezone.now())
+                transaction.on_commit(lambda ids=ids: notify_overdue_invoices_task.delay(ids))
+        marked += len(ids)
+        if len(ids) < batch_size:
+            return marked
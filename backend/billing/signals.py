@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from decimal import Decimal
+from .models import Invoice
+from .services import record_revenue, REVENUE_BOOKING_STATUSES
+from bookings.models import Booking
+
+@receiver(post_save, sender=Invoice)
+def invoice_revenue_post_save(sender, instance, created, **kwargs):
+    """Moves the invoice's amount into or out of the revenue rollup when it is paid or refunded."""
+    if not created and not (instance.has_changed('status') or instance.has_changed('amount')):
+        return
+    was_paid = not created and instance.previous('status') == 'paid'
+    is_paid = instance.status == 'paid'
+    if not (was_paid or is_paid):
+        return
+
+    booking = Booking.objects.only('unit_id', 'start_date', 'status').get(pk=instance.booking_id)
+    if booking.status not in REVENUE_BOOKING_STATUSES:
+        return
+
+    amount = Decimal(str(instance.amount if is_paid else 0)) - Decimal(str(instance.previous('amount') if was_paid else 0))
+    record_revenue(booking.unit_id, booking.start_date, amount, int(is_paid) - int(was_paid))
+
+@receiver(post_delete, sender=Invoice)
+def invoice_revenue_post_delete(sender, instance, **kwargs):
+    if instance.previous('status') != 'paid':
+        return
+    booking = Booking.objects.filter(pk=instance.booking_id).only('unit_id', 'start_date', 'status').first()
+    if booking and booking.status in REVENUE_BOOKING_STATUSES:
+        record_revenue(booking.unit_id, booking.start_date, -instance.previous('amount'), -1)
+
+@receiver(post_save, sender=Booking)
+def booking_revenue_post_save(sender, instance, created, **kwargs):
+    """A paid booking that is cancelled, completed or moved shifts its revenue in the rollup."""
+    if created or not any(instance.has_changed(field) for field in ('status', 'unit', 'start_date')):
+        return
+    was_counted = instance.previous('status') in REVENUE_BOOKING_STATUSES
+    is_counted = instance.status in REVENUE_BOOKING_STATUSES
+    moved = instance.has_changed('unit') or instance.has_changed('start_date')
+    if was_counted == is_counted and not (is_counted and moved):
+        return
+
+    invoice = Invoice.objects.filter(booking_id=instance.pk, status='paid').only('amount').first()
+    if not invoice:
+        return
+    if was_counted and instance.previous('unit'):
+        record_revenue(instance.previous('unit'), instance.previous('start_date'), -invoice.amount, -1)
+    if is_counted and instance.unit_id:
+        record_revenue(instance.unit_id, instance.start_date, invoice.amount, 1)
@@ -17,8 +17,11 @@ def generate_invoice_for_booking(booking_id):
         if hasattr(booking, 'invoice'):
             return False
 
-        duration = (booking.end_date - booking.start_date).days
-        amount = booking.unit.base_price * duration
+        # Bill what the booking was quoted at; price it from the rules only if it never was
+        amount = booking.total_price
+        if amount is None:
+            from bookings.services import calculate_booking_price
+            amount = calculate_booking_price(booking.unit, booking.start_date, booking.end_date)
         due_date = timezone.now().date() + timedelta(days=7)
 
         invoice = Invoice.objects.create(
@@ -39,3 +42,49 @@ def generate_invoice_for_booking(booking_id):
 @shared_task
 def generate_invoice_pdf_task(invoice_id):
     return generate_invoice_pdf(invoice_id)
+
+@shared_task
+def render_invoice_pdfs_task(invoice_ids):
+    """One batch for the PDF workers; returns the per-document timings."""
+    from .pdf import render_invoice_pdfs
+    return render_invoice_pdfs(invoice_ids)
+
+@shared_task
+def generate_export_task(dataset, user_id, file_format):
+    """Builds a large export in the background and notifies the user when it is in the vault."""
+    from django.contrib.auth import get_user_model
+    from notifications.utils import send_notification
+    from .exports import EXPORTS, export_to_document
+
+    user = get_user_model().objects.get(id=user_id)
+    title = EXPORTS[dataset][0]
+    try:
+        doc = export_to_document(dataset, user, file_format)
+    except Exception as e:
+        print(f"Export Error: {e}")
+        send_notification(user_id, f"{title} export failed", 'error')
+        return None
+
+    send_notification(user_id, f"{title} export is ready in your documents", 'success', document_id=doc.id)
+    return doc.id
+
+@shared_task
+def mark_overdue_invoices_task():
+    from .services import mark_overdue_invoices
+    return mark_overdue_invoices()
+
+@shared_task
+def notify_overdue_invoices_task(invoice_ids):
+    """Notifications for a batch of overdue invoices: each tenant, plus one summary per landlord."""
+    from collections import Counter
+    from notifications.utils import send_notification
+    from billing.models import Invoice
+
+    per_owner = Counter()
+    for invoice_id, tenant_id, owner_id in Invoice.objects.filter(pk__in=invoice_ids).values_list(
+        'pk', 'booking__tenant_id', 'booking__unit__property__owner_id'
+    ):
+        send_notification(tenant_id, f"Invoice #{invoice_id} is overdue", 'warning')
+        per_owner[owner_id] += 1
+    for owner_id, count in per_owner.items():
+        send_notification(owner_id, f"{count} invoice(s) became overdue", 'warning')
@@ -3,10 +3,21 @@ from django.contrib.auth import get_user_model
 from datetime import date, timedelta
 from properties.models import Property, Unit
 from bookings.models import Booking
-from billing.models import Invoice
+from billing.models import Invoice, RevenueRollup
+from billing.services import rebuild_revenue_rollup, verify_revenue_rollup, mark_overdue_invoices
+from billing.models import Transaction
+from bookings.services import complete_finished_bookings
+from bookings.tasks import process_completed_bookings_task
+from decimal import Decimal
 from billing.tasks import generate_invoice_for_booking
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.test import override_settings
+from unittest import mock
+from io import BytesIO
+import tempfile
+from billing.tasks import generate_export_task
+from properties.models import Document
 
 User = get_user_model()
 
@@ -82,4 +93,156 @@ class BillingTest(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         invoice.refresh_from_db()
-        self.assertEqual(invoice.status, 'pending')
\ No newline at end of file
+        self.assertEqual(invoice.status, 'pending')
+
+    def test_revenue_rollup_follows_payment_and_refund(self):
+        self.booking.status = 'confirmed'
+        self.booking.save()
+        invoice = Invoice.objects.create(
+            booking=self.booking, amount=Decimal('200.00'), due_date=date.today() + timedelta(days=7)
+        )
+        self.assertFalse(RevenueRollup.objects.exists())
+
+        self.client.force_authenticate(user=self.tenant)
+        self.client.post(f'/api/v1/billing/invoices/{invoice.id}/pay/')
+        rollup = RevenueRollup.objects.get(owner=self.landlord, unit=self.unit)
+        self.assertEqual(rollup.revenue, Decimal('200.00'))
+        self.assertEqual(rollup.paid_invoices, 1)
+
+        self.client.force_authenticate(user=self.landlord)
+        response = self.client.get('/api/v1/bookings/monthly_revenue/', {'verify': '1'})
+        self.assertTrue(response.data['verified'])
+        self.assertEqual(response.data['results'][0]['revenue'], Decimal('200.00'))
+
+        response = self.client.post(f'/api/v1/billing/invoices/{invoice.id}/refund/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.revenue, Decimal('0.00'))
+        self.assertEqual(self.client.get('/api/v1/bookings/monthly_revenue/').data, [])
+
+    def test_revenue_rollup_rebuild(self):
+        self.booking.status = 'confirmed'
+        self.booking.save()
+        Invoice.objects.create(
+            booking=self.booking, amount=Decimal('200.00'), due_date=date.today(), status='paid'
+        )
+        RevenueRollup.objects.update(revenue=Decimal('1.00'))
+        self.assertEqual(len(verify_revenue_rollup(self.landlord)), 1)
+
+        self.assertEqual(rebuild_revenue_rollup(), 1)
+        self.assertEqual(verify_revenue_rollup(self.landlord), [])
+
+        # Cancelling the paid booking takes its revenue out again
+        self.booking.status = 'cancelled'
+        self.booking.save()
+        self.assertEqual(RevenueRollup.objects.get().revenue, Decimal('0.00'))
+
+    def test_export_csv_streams_rows(self):
+        self.client.force_authenticate(user=self.landlord)
+        response = self.client.get('/api/v1/exports/bookings/', {'file_format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Property,Unit,Tenant,Start Date,End Date,Status,Amount')
+        self.assertEqual(lines[1].split(',')[:3], ['Test Property', '101', 'tenant'])
+        self.assertEqual(lines[1].split(',')[-1], '200.00')
+
+        Booking.objects.filter(pk=self.booking.pk).update(total_price=None)
+        response = self.client.get('/api/v1/exports/bookings/', {'file_format': 'csv'})
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines()[1].split(',')[-1], '0.00')
+
+        response = self.client.get('/api/v1/exports/payouts/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_xlsx(self):
+        from openpyxl import load_workbook
+        Invoice.objects.create(booking=self.booking, amount=Decimal('200.00'), due_date=date.today())
+
+        self.client.force_authenticate(user=self.tenant)
+        response = self.client.get('/api/v1/exports/invoices/', {'file_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(load_workbook(BytesIO(response.content)).active.values)
+        self.assertEqual(rows[0][0], 'Invoice')
+        self.assertEqual(rows[1][5], 200)
+
+    @override_settings(EXPORT_SYNC_MAX_ROWS=0)
+    def test_large_export_runs_in_background(self):
+        self.client.force_authenticate(user=self.landlord)
+        with mock.patch('billing.views.generate_export_task.delay') as delay:
+            delay.return_value.id = 'export-task'
+            response = self.client.get('/api/v1/exports/bookings/', {'file_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        delay.assert_called_once_with('bookings', self.landlord.id, 'xlsx')
+        self.assertEqual(response.data['task_id'], 'export-task')
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            with mock.patch('notifications.utils.send_notification') as notify:
+                doc_id = generate_export_task('bookings', self.landlord.id, 'csv')
+            doc = Document.objects.get(id=doc_id)
+            self.assertEqual((doc.owner, doc.category), (self.landlord, 'report'))
+            self.assertIn(b'Test Property', doc.file.read())
+            doc.file.close()
+            notify.assert_called_once_with(self.landlord.id, mock.ANY, 'success', document_id=doc_id)
+
+            response = self.client.get('/api/v1/properties/documents/')
+            self.assertIn(doc_id, [d['id'] for d in response.data['results']])
+
+    def test_completion_sweep_pays_out_once_per_batch(self):
+        past = []
+        for offset in (10, 20, 30):
+            booking = Booking.objects.create(
+                unit=self.unit, tenant=self.tenant, status='confirmed', total_price=Decimal('150.00'),
+                start_date=date.today() - timedelta(days=offset + 3), end_date=date.today() - timedelta(days=offset)
+            )
+            Invoice.objects.create(booking=booking, amount=Decimal('150.00'), due_date=date.today(), status='paid')
+            past.append(booking.id)
+
+        with mock.patch('bookings.services.process_completed_bookings_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(complete_finished_bookings(batch_size=2), 3)
+        # One downstream task per batch, not per booking
+        self.assertEqual(delay.call_count, 2)
+        self.assertEqual(sorted(sum((call.args[0] for call in delay.call_args_list), [])), sorted(past))
+        self.assertEqual(Booking.objects.filter(status='completed').count(), 3)
+        self.assertEqual(Booking.objects.get(id=self.booking.id).status, 'pending')
+
+        with mock.patch('notifications.utils.send_notification') as notify:
+            self.assertEqual(process_completed_bookings_task(past), 3)
+            self.assertEqual(process_completed_bookings_task(past), 0)
+        notify.assert_called_with(self.landlord.id, '3 stay(s) completed', 'info')
+        payouts = Transaction.objects.filter(transaction_type='payout', user=self.landlord)
+        self.assertEqual(payouts.count(), 3)
+        self.assertFalse(Invoice.objects.filter(payout_status='pending').exists())
+
+    def test_overdue_sweep(self):
+        overdue = Invoice.objects.create(booking=self.booking, amount=Decimal('200.00'), due_date=date.today() - timedelta(days=1))
+        with mock.patch('billing.tasks.notify_overdue_invoices_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(mark_overdue_invoices(), 1)
+        delay.assert_called_once_with([overdue.id])
+        overdue.refresh_from_db()
+        self.assertEqual(overdue.status, 'overdue')
+        self.assertEqual(mark_overdue_invoices(), 0)
+
+    def test_batch_pdf_rendering_reuses_resources_and_documents(self):
+        from billing import pdf
+        invoice = Invoice.objects.create(booking=self.booking, amount=Decimal('200.00'), due_date=date.today())
+        pdf._resources.cache_clear()
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media), \
+                mock.patch('billing.pdf.CSS') as css, mock.patch('billing.pdf.HTML') as html:
+            html.return_value.write_pdf.return_value = b'%PDF-1.7 invoice'
+            first = pdf.render_invoice_pdfs([invoice.id, 0])
+            second = pdf.render_invoice_pdfs([invoice.id])
+        pdf._resources.cache_clear()
+
+        # The stylesheet is parsed once per process and shared by every render
+        css.assert_called_once()
+        self.assertEqual(html.return_value.write_pdf.call_args.kwargs['stylesheets'], [css.return_value])
+        self.assertEqual(first[1], {
+            'invoice': 0, 'document': None, 'bytes': None, 'render_ms': None, 'store_ms': None, 'error': 'Invoice does not exist.'
+        })
+        self.assertIsNotNone(first[0]['render_ms'])
+        self.assertEqual(first[0]['bytes'], 16)
+        # Re-rendering replaces the invoice's document
+        self.assertEqual(second[0]['document'], first[0]['document'])
+        self.assertEqual(Document.objects.filter(unit=self.unit).count(), 1)
+        self.assertEqual(pdf.timing_summary(first)['failed'], 1)
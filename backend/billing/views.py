@@ -3,22 +3,32 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
 from .models import Invoice, Transaction
-from .serializers import InvoiceSerializer
+from .serializers import InvoiceSerializer, TransactionSerializer
+from common.pagination import CursorOrPageNumberPagination
+from common.views import ConditionalGetMixin
 from django.db import transaction
 from django.db.models import Sum
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.views import APIView
+import io
+from .exports import EXPORTS, FORMATS, export_queryset, export_headers, export_filename, iter_export_rows, stream_csv, write_export
+from .tasks import generate_export_task
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.all().select_related('booking__unit__property', 'booking__tenant')
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
             return Invoice.objects.all()
+        # Both paths are forward single-valued joins, so rows cannot repeat and no DISTINCT is needed
         return Invoice.objects.filter(
             Q(booking__tenant=user) | Q(booking__unit__property__owner=user)
-        ).distinct()
+        )
 
     @action(detail=True, methods=['post'])
     @transaction.atomic
@@ -45,6 +55,30 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         
         return Response(InvoiceSerializer(invoice).data)
 
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def refund(self, request, pk=None):
+        invoice = self.get_object()
+        if invoice.booking.unit.property.owner != request.user and request.user.role != 'admin':
+            return Response({"detail": "Forbidden"}, status=403)
+
+        if invoice.status != 'paid':
+            return Response({"detail": "Only paid invoices can be refunded"}, status=400)
+
+        invoice.status = 'refunded'
+        invoice.save()
+
+        Transaction.objects.create(
+            invoice=invoice,
+            user=invoice.booking.tenant,
+            amount=invoice.amount,
+            transaction_type='refund',
+            description=f"Refund for {invoice.booking.unit.title}",
+            is_verified=True
+        )
+
+        return Response(InvoiceSerializer(invoice).data)
+
     @action(detail=False, methods=['get'])
     def landlord_ledger(self, request):
         """Returns the landlord's total earnings and verified transactions."""
@@ -57,4 +91,54 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         return Response({
             'balance': total_payouts,
             'recent_transactions': transactions.order_by('-created_at')[:10].values()
-        })
\ No newline at end of file
+        })
+
+class TransactionViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Ledger entries: a user's own transactions, plus those on invoices for a landlord's properties."""
+    serializer_class = TransactionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
+    # Ledger rows are never edited
+    conditional_updated_field = 'created_at'
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'admin':
+            return Transaction.objects.all()
+        return Transaction.objects.filter(
+            Q(user=user) | Q(invoice__booking__unit__property__owner=user)
+        )
+
+class ExportView(APIView):
+    """
+    GET /exports/<dataset>/?file_format=csv|xlsx[&background=1]
+    Small exports are returned directly; large ones (or background=1) are queued and
+    delivered to the document vault with a notification.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, dataset):
+        if dataset not in EXPORTS:
+            return Response({"error": f"Unknown export. Choose one of: {', '.join(EXPORTS)}"}, status=404)
+        # Not 'format': DRF reserves that query parameter for renderer selection
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FORMATS:
+            return Response({"error": "file_format must be csv or xlsx"}, status=400)
+
+        background = request.query_params.get('background') in ('1', 'true')
+        if background or export_queryset(dataset, request.user).count() > settings.EXPORT_SYNC_MAX_ROWS:
+            result = generate_export_task.delay(dataset, request.user.id, file_format)
+            return Response({
+                "detail": "Export started. It will appear in your documents when ready.",
+                "task_id": result.id
+            }, status=status.HTTP_202_ACCEPTED)
+
+        content_type = FORMATS[file_format][0]
+        if file_format == 'csv':
+            response = StreamingHttpResponse(stream_csv(export_headers(dataset), iter_export_rows(dataset, request.user)), content_type=content_type)
+        else:
+            buffer = io.BytesIO()
+            write_export(dataset, request.user, file_format, buffer)
+            response = HttpResponse(buffer.getvalue(), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, file_format)}"'
+        return response
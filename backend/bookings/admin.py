@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, PricingRule
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('unit', 'tenant', 'start_date', 'end_date', 'status', 'total_price')
     list_filter = ('status', 'start_date', 'unit__property')
     search_fields = ('unit__title', 'unit__unit_number', 'tenant__username')
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'rule_type', 'multiplier', 'property', 'unit', 'priority', 'is_active')
+    list_filter = ('rule_type', 'is_active', 'property')
+    search_fields = ('name', 'unit__title', 'property__title')
@@ -0,0 +1,138 @@
+"""
+Occupancy, ADR and RevPAR for a landlord's portfolio.
+
+The window's bookings are loaded once as arrays (unit, start, end, price). Each booking is
+written into a units x days difference array, and a cumulative sum turns that into day-level
+occupancy and prorated revenue. Days are then collapsed into months with one reduceat, and
+units into properties with one add.at; nothing loops over bookings or nights in Python.
+"""
+from datetime import date
+
+import numpy as np
+
+from properties.models import Unit
+from .models import Booking
+
+# Stays that occupy the unit and earn revenue
+OCCUPIED_STATUSES = ('confirmed', 'completed')
+MAX_WINDOW_DAYS = 731
+
+
+def _month_starts(start_date, end_date):
+    months, month = [], start_date.replace(day=1)
+    while month < end_date:
+        months.append(month)
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return months
+
+
+def _metrics(available, occupied, revenue):
+    """Vectorized over arrays of equal shape; returns arrays."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        occupancy = np.where(available > 0, occupied / available, 0.0)
+        adr = np.where(occupied > 0, revenue / occupied, 0.0)
+        revpar = np.where(available > 0, revenue / available, 0.0)
+    return occupancy, adr, revpar
+
+
+def _rows(available, occupied, revenue):
+    occupancy, adr, revpar = _metrics(available, occupied, revenue)
+    return [
+        {
+            'available_nights': int(available[i]),
+            'occupied_nights': int(round(occupied[i])),
+            'occupancy_rate': round(float(occupancy[i]), 4),
+            'revenue': round(float(revenue[i]), 2),
+            'adr': round(float(adr[i]), 2),
+            'revpar': round(float(revpar[i]), 2),
+        }
+        for i in range(len(available))
+    ]
+
+
+def occupancy_analytics(owner, start_date, end_date):
+    """
+    Per unit, per property (with a monthly breakdown) and per month for the nights
+    start_date <= night < end_date. A booking's price is spread evenly over its nights.
+    """
+    days = (end_date - start_date).days
+    origin = start_date.toordinal()
+    months = _month_starts(start_date, end_date)
+    # Column where each month begins inside the window
+    month_edges = np.array([max(month.toordinal() - origin, 0) for month in months])
+    nights_per_month = np.diff(np.append(month_edges, days))
+
+    units = list(
+        Unit.objects.filter(property__owner=owner).order_by('pk')
+        .values_list('pk', 'unit_number', 'property_id', 'property__title')
+    )
+    unit_ids = np.array([unit[0] for unit in units], dtype=np.int64)
+
+    occupied = np.zeros((len(units), days + 1))
+    revenue = np.zeros((len(units), days + 1))
+    rows = list(
+        Booking.objects.filter(
+            unit__property__owner=owner, status__in=OCCUPIED_STATUSES,
+            start_date__lt=end_date, end_date__gt=start_date
+        ).values_list('unit_id', 'start_date', 'end_date', 'total_price')
+    )
+    if rows:
+        unit_id, start, end, price = zip(*rows)
+        row = np.searchsorted(unit_ids, np.array(unit_id, dtype=np.int64))
+        start = np.array([day.toordinal() for day in start]) - origin
+        end = np.array([day.toordinal() for day in end]) - origin
+        nightly = np.array([float(amount or 0) for amount in price]) / np.maximum(end - start, 1)
+        first, last = np.clip(start, 0, days), np.clip(end, 0, days)
+        np.add.at(occupied, (row, first), 1)
+        np.add.at(occupied, (row, last), -1)
+        np.add.at(revenue, (row, first), nightly)
+        np.add.at(revenue, (row, last), -nightly)
+    # Overlapping stays (e.g. imported history) still occupy a night only once
+    occupied = np.minimum(np.cumsum(occupied[:, :days], axis=1), 1)
+    revenue = np.cumsum(revenue[:, :days], axis=1)
+
+    # units x months
+    unit_occupied = np.add.reduceat(occupied, month_edges, axis=1) if units else np.zeros((0, len(months)))
+    unit_revenue = np.add.reduceat(revenue, month_edges, axis=1) if units else np.zeros((0, len(months)))
+    unit_available = np.broadcast_to(nights_per_month, unit_occupied.shape)
+
+    # properties x months
+    property_ids, property_row = np.unique(np.array([unit[2] for unit in units], dtype=np.int64), return_inverse=True)
+    property_titles = {unit[2]: unit[3] for unit in units}
+    property_occupied = np.zeros((len(property_ids), len(months)))
+    property_revenue = np.zeros((len(property_ids), len(months)))
+    property_available = np.zeros((len(property_ids), len(months)))
+    np.add.at(property_occupied, property_row, unit_occupied)
+    np.add.at(property_revenue, property_row, unit_revenue)
+    np.add.at(property_available, property_row, unit_available)
+
+    unit_totals = _rows(unit_available.sum(axis=1), unit_occupied.sum(axis=1), unit_revenue.sum(axis=1))
+    property_totals = _rows(property_available.sum(axis=1), property_occupied.sum(axis=1), property_revenue.sum(axis=1))
+    property_months = [
+        _rows(property_available[i], property_occupied[i], property_revenue[i]) for i in range(len(property_ids))
+    ]
+    month_totals = _rows(unit_available.sum(axis=0), unit_occupied.sum(axis=0), unit_revenue.sum(axis=0))
+    total = _rows(
+        np.array([unit_available.sum()]), np.array([unit_occupied.sum()]), np.array([unit_revenue.sum()])
+    )[0]
+    month_labels = [month.strftime('%Y-%m') for month in months]
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'totals': total,
+        'months': [{'month': label, **values} for label, values in zip(month_labels, month_totals)],
+        'properties': [
+            {
+                'property': int(property_id),
+                'title': property_titles[property_id],
+                **property_totals[i],
+                'months': [{'month': label, **values} for label, values in zip(month_labels, property_months[i])],
+            }
+            for i, property_id in enumerate(property_ids)
+        ],
+        'units': [
+            {'unit': unit[0], 'unit_number': unit[1], 'property': unit[2], **unit_totals[i]}
+            for i, unit in enumerate(units)
+        ],
+    }
@@ -0,0 +1,99 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, DatabaseError
+from properties.models import Property, Unit
+from bookings.models import Booking
+from bookings.services import create_booking, uses_exclusion_engine
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Benchmarks concurrent booking attempts under the lock and exclusion engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=400)
+        parser.add_argument('--units', type=int, default=4, help='Fewer units means more contention')
+        parser.add_argument('--horizon', type=int, default=180, help='Days over which start dates are drawn')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}, {options['threads']} threads, {options['attempts']} attempts")
+
+        for engine in ('lock', 'exclusion'):
+            if engine == 'exclusion' and not uses_exclusion_engine(engine):
+                self.stdout.write(self.style.WARNING('exclusion: requires PostgreSQL, skipped'))
+                continue
+            self.run_engine(engine, options)
+
+    def run_engine(self, engine, options):
+        landlord = User.objects.create_user(username=f'bench_landlord_{engine}', password='bench', role='landlord')
+        tenant = User.objects.create_user(username=f'bench_tenant_{engine}', password='bench', role='tenant')
+        prop = Property.objects.create(owner=landlord, title=f'Bench {engine}', address='-', description='-')
+        units = [
+            Unit.objects.create(
+                property=prop, unit_number=str(i), title=f'Bench {i}', description='-', base_price=Decimal('100.00')
+            )
+            for i in range(options['units'])
+        ]
+
+        rng = random.Random(options['seed'])
+        origin = date.today() + timedelta(days=365)
+        attempts = []
+        for _ in range(options['attempts']):
+            start = origin + timedelta(days=rng.randrange(options['horizon']))
+            attempts.append((rng.choice(units), start, start + timedelta(days=rng.randint(1, 7))))
+
+        def attempt(args):
+            unit, start, end = args
+            try:
+                create_booking(tenant, unit, start, end, engine=engine, notify=False)
+                return 'booked'
+            except ValidationError:
+                return 'conflict'
+            except DatabaseError:
+                return 'error'
+
+        def worker(chunk):
+            try:
+                return [attempt(args) for args in chunk]
+            finally:
+                connections.close_all()
+
+        chunks = [attempts[i::options['threads']] for i in range(options['threads'])]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            outcomes = [outcome for chunk in pool.map(worker, chunks) for outcome in chunk]
+        elapsed = time.perf_counter() - started
+
+        overlaps = self.count_overlaps(units)
+        self.stdout.write(
+            f"{engine:>9}: {elapsed:.2f}s, {len(outcomes) / elapsed:.0f} attempts/s, "
+            f"{outcomes.count('booked')} booked, {outcomes.count('conflict')} conflicts, "
+            f"{outcomes.count('error')} db errors, {overlaps} overlaps"
+        )
+
+        prop.delete()
+        landlord.delete()
+        tenant.delete()
+
+    def count_overlaps(self, units):
+        """Sanity check: no two active bookings of a unit may violate the buffer."""
+        overlaps = 0
+        for unit in units:
+            buffer = timedelta(days=unit.turnover_buffer_hours // 24)
+            previous_end = None
+            for start, end in Booking.objects.filter(
+                unit=unit, status__in=Booking.ACTIVE_STATUSES
+            ).order_by('start_date').values_list('start_date', 'end_date'):
+                if previous_end and start < previous_end + buffer:
+                    overlaps += 1
+                previous_end = max(previous_end or end, end)
+        return overlaps
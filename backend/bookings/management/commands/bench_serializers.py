@@ -0,0 +1,100 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from properties.models import Property, Unit, PropertyImage
+from properties.views import PropertyViewSet
+from bookings.models import Booking
+from bookings.views import BookingViewSet
+
+User = get_user_model()
+
+# label -> (viewset, [(shape, query params), ...])
+BENCHMARKS = (
+    ('bookings', BookingViewSet, [
+        ('full', {}),
+        ('expand=unit_details', {'expand': 'unit_details'}),
+        ('flat (expand=)', {'expand': ''}),
+        ('fields=id,unit,dates,status', {'fields': 'id,unit,start_date,end_date,status,total_price'}),
+    ]),
+    ('properties', PropertyViewSet, [
+        ('full', {}),
+        ('expand=units', {'expand': 'units'}),
+        ('flat (expand=)', {'expand': ''}),
+        ('fields=id,title,address', {'fields': 'id,title,address'}),
+    ]),
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks full vs sparse (fields=/expand=) list serialization on a seeded landlord'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=20)
+        parser.add_argument('--units', type=int, default=25, help='Units per property')
+        parser.add_argument('--images', type=int, default=4, help='Images per unit')
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        # Everything is seeded and measured inside a transaction that is rolled back
+        with transaction.atomic():
+            landlord = self.seed(options)
+            self.stdout.write(
+                f"Database: {connection.vendor}, {options['properties']} properties x {options['units']} units "
+                f"x {options['images']} images, {options['bookings']} bookings"
+            )
+            for label, viewset, shapes in BENCHMARKS:
+                for name, params in shapes:
+                    self.measure(viewset, label, name, params, landlord, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        landlord = User.objects.create_user(username='bench_serializers_landlord', password='bench', role='landlord')
+        tenant = User.objects.create_user(username='bench_serializers_tenant', password='bench', role='tenant')
+        properties = Property.objects.bulk_create([
+            Property(owner=landlord, title=f'Bench {i}', address='-', description='-')
+            for i in range(options['properties'])
+        ])
+        units = Unit.objects.bulk_create([
+            Unit(property=prop, unit_number=str(i), title=f'Bench {i}', description='-', base_price=Decimal('100.00'))
+            for prop in properties
+            for i in range(options['units'])
+        ])
+        PropertyImage.objects.bulk_create([
+            PropertyImage(unit=unit, image=f'properties/bench_{unit.pk}_{i}.jpg')
+            for unit in units
+            for i in range(options['images'])
+        ])
+        origin = date.today()
+        Booking.objects.bulk_create([
+            Booking(
+                unit=units[i % len(units)], tenant=tenant, status='confirmed', total_price=Decimal('300.00'),
+                start_date=origin + timedelta(days=i // len(units) * 4),
+                end_date=origin + timedelta(days=i // len(units) * 4 + 3),
+            )
+            for i in range(options['bookings'])
+        ])
+        return landlord
+
+    def measure(self, viewset, label, name, params, user, repeat):
+        factory = APIRequestFactory()
+        best, queries, size = None, 0, 0
+        for _ in range(repeat):
+            request = Request(factory.get('/', params, HTTP_HOST=settings.ALLOWED_HOSTS[0].lstrip('.*') or 'localhost'))
+            request.user = user
+            view = viewset(request=request, format_kwarg=None, action='list')
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                data = view.get_serializer(view.get_queryset(), many=True).data
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            queries, size = len(captured), len(data)
+        self.stdout.write(f"{label:>10} {name:<28} {best * 1000:9.1f} ms  {queries:4d} queries  {size} rows")
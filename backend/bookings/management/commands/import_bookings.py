@@ -0,0 +1,38 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from bookings.services import import_bookings
+
+class Command(BaseCommand):
+    help = 'Bulk-imports bookings from a CSV with columns unit,tenant,start_date,end_date[,status,total_price]'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--notify', action='store_true', help='Send a confirmation email per booking')
+        parser.add_argument('--generate-invoices', action='store_true', help='Create invoices for confirmed bookings')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='') as handle:
+                rows = list(csv.DictReader(handle))
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['csv_path']}: {e}")
+
+        report = import_bookings(
+            rows,
+            notify=options['notify'],
+            generate_invoices=options['generate_invoices'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+
+        for error in report['errors']:
+            # +2: header line and 1-based line numbers
+            self.stdout.write(self.style.WARNING(f"Line {error['row'] + 2}: {'; '.join(error['errors'])}"))
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(rows) - len(report['errors'])} of {len(rows)} bookings ({len(report['errors'])} rejected)."
+        ))
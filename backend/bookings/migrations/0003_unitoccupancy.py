@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_remove_property_base_price_remove_property_features_and_more'),
+        ('bookings', '0002_remove_booking_property_booking_total_price_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intervals', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('unit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='properties.unit')),
+            ],
+            options={
+                'verbose_name_plural': 'Unit occupancies',
+            },
+        ),
+    ]
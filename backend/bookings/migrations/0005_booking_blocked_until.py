@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:38
+
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def backfill_blocked_until(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    bookings = []
+    for booking in Booking.objects.select_related('unit').exclude(unit=None).iterator(chunk_size=1000):
+        booking.blocked_until = booking.end_date + timedelta(days=booking.unit.turnover_buffer_hours // 24)
+        bookings.append(booking)
+    Booking.objects.bulk_update(bookings, ['blocked_until'], batch_size=1000)
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE bookings_booking ADD CONSTRAINT booking_no_overlap "
+        "EXCLUDE USING gist (unit_id WITH =, daterange(start_date, blocked_until) WITH &&) "
+        "WHERE (status IN ('pending', 'confirmed', 'completed'))"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_no_overlap")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_unit_dates_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='blocked_until',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_blocked_until, migrations.RunPython.noop),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:42
+
+import django.core.validators
+from django.db import migrations, models
+import datetime
+import django.db.models.deletion
+import re
+
+
+def create_peak_season_rule(apps, schema_editor):
+    # Carries over the previously hard-coded June-August 20% surge, now applied per night
+    PricingRule = apps.get_model('bookings', 'PricingRule')
+    PricingRule.objects.create(
+        name='Peak Season',
+        rule_type='season',
+        multiplier='1.200',
+        start_date=datetime.date(2000, 6, 1),
+        end_date=datetime.date(2000, 8, 31),
+        repeats_yearly=True,
+    )
+
+
+def remove_peak_season_rule(apps, schema_editor):
+    PricingRule = apps.get_model('bookings', 'PricingRule')
+    PricingRule.objects.filter(name='Peak Season', property=None, unit=None).delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_remove_property_base_price_remove_property_features_and_more'),
+        ('bookings', '0005_booking_blocked_until'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('rule_type', models.CharField(choices=[('season', 'Season'), ('weekday', 'Weekday'), ('length_of_stay', 'Length of Stay Discount')], max_length=20)),
+                ('multiplier', models.DecimalField(decimal_places=3, max_digits=5)),
+                ('priority', models.IntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('repeats_yearly', models.BooleanField(default=False)),
+                ('weekdays', models.CharField(blank=True, max_length=13, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')])),
+                ('min_nights', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='properties.property')),
+                ('unit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='properties.unit')),
+            ],
+            options={
+                'ordering': ['-priority', 'id'],
+            },
+        ),
+        migrations.RunPython(create_peak_season_rule, remove_peak_season_rule),
+    ]
@@ -1,15 +1,21 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.validators import validate_comma_separated_integer_list
 from datetime import timedelta
+from bisect import bisect_left, bisect_right, insort
+from common.models import ChangeTrackingMixin
 
-class Booking(models.Model):
+class Booking(ChangeTrackingMixin, models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     )
+    # Statuses that occupy the unit and therefore block other bookings
+    ACTIVE_STATUSES = ('pending', 'confirmed', 'completed')
+    tracked_fields = ('status', 'unit', 'start_date', 'end_date')
 
     unit = models.ForeignKey('properties.Unit', on_delete=models.CASCADE, related_name='bookings', null=True)
     tenant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bookings')
@@ -17,39 +23,196 @@ class Booking(models.Model):
     end_date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # end_date plus the unit's turnover buffer. On PostgreSQL an exclusion constraint over
+    # daterange(start_date, blocked_until) rejects buffered overlaps atomically.
+    blocked_until = models.DateField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the per-unit date probe of the availability anti-join
+            models.Index(fields=['unit', 'start_date', 'end_date'], name='booking_unit_dates_idx'),
+            # Keyset pagination order, overall and per tenant
+            models.Index(fields=['-created_at', '-id'], name='booking_created_idx'),
+            models.Index(fields=['tenant', '-created_at', '-id'], name='booking_tenant_created_idx'),
+            # Completion sweep: only confirmed bookings are ever scanned by end date
+            models.Index(fields=['end_date'], condition=models.Q(status='confirmed'), name='booking_confirmed_end_idx'),
+        ]
+
     def clean(self):
         if self.start_date and self.end_date and self.start_date >= self.end_date:
             raise ValidationError("End date must be after start date.")
         
-        # Complex Overlap Logic with Turnover Buffer
-        # We need to ensure that (existing_end + buffer) <= new_start 
-        # OR (new_end + buffer) <= existing_start
-        
-        buffer_days = (self.unit.turnover_buffer_hours / 24)
-        buffer_delta = timedelta(days=buffer_days)
-
-        # Check for direct overlaps OR buffer violations
+        # Overlap Logic with Turnover Buffer, answered from the unit's occupancy index:
         # A booking overlaps if:
         # existing_start < new_end + buffer AND existing_end + buffer > new_start
-        overlapping_bookings = Booking.objects.filter(
-            unit=self.unit,
-            status__in=['pending', 'confirmed', 'completed'],
-            start_date__lt=self.end_date + buffer_delta,
-            end_date__gt=self.start_date - buffer_delta
-        ).exclude(pk=self.pk)
-        
-        if overlapping_bookings.exists():
+        occupancy = UnitOccupancy.for_unit(self.unit)
+        if not occupancy.is_free(self.start_date, self.end_date, self.unit.turnover_buffer_hours, exclude_booking_id=self.pk):
             raise ValidationError(f"This unit is unavailable. Turnover buffer of {self.unit.turnover_buffer_hours}h required.")
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, check_overlap=True, **kwargs):
         if not self.total_price and self.start_date and self.end_date:
-            days = (self.end_date - self.start_date).days
-            self.total_price = self.unit.base_price * days
-        self.clean()
+            from .pricing import get_unit_pricing
+            self.total_price = get_unit_pricing(self.unit).quote(self.start_date, self.end_date)['total']
+        if self.end_date:
+            self.blocked_until = self.end_date + timedelta(days=self.unit.turnover_buffer_hours // 24)
+        # Callers that already guarantee availability (create_booking) skip the second check,
+        # and so do edits that leave the unit, dates and status untouched
+        if check_overlap and self.changed_fields():
+            self.clean()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Booking {self.pk} - {self.unit} by {self.tenant}"
+
+
+class UnitOccupancy(models.Model):
+    """
+    Precomputed interval index of the active bookings of a unit.
+    Availability checks read this single row instead of scanning the bookings table.
+    """
+    unit = models.OneToOneField('properties.Unit', on_delete=models.CASCADE, related_name='occupancy')
+    # Sorted [start_ordinal, end_ordinal, booking_id] triples. Active bookings never overlap
+    # (clean() enforces it), so the intervals are disjoint and sorted by both start and end.
+    intervals = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Calendar day states
+    FREE, BOOKED, BUFFER = b'0', b'1', b'2'
+
+    class Meta:
+        verbose_name_plural = "Unit occupancies"
+
+    def __str__(self):
+        return f"Occupancy for {self.unit_id} ({len(self.intervals)} bookings)"
+
+    @classmethod
+    def for_unit(cls, unit, lock=False):
+        """Returns the unit's index, building it from the bookings table the first time."""
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        try:
+            return queryset.get(unit_id=unit.pk)
+        except cls.DoesNotExist:
+            occupancy, _ = cls.objects.get_or_create(unit_id=unit.pk)
+            occupancy.rebuild()
+            return occupancy
+
+    def rebuild(self):
+        rows = Booking.objects.filter(
+            unit_id=self.unit_id,
+            status__in=Booking.ACTIVE_STATUSES
+        ).values_list('start_date', 'end_date', 'id')
+        self.intervals = sorted([start.toordinal(), end.toordinal(), pk] for start, end, pk in rows)
+        self.save(update_fields=['intervals', 'updated_at'])
+
+    def is_free(self, start_date, end_date, buffer_hours, exclude_booking_id=None):
+        """
+        Buffer is applied by widening the probe window, so changing a unit's
+        turnover_buffer_hours never invalidates the index.
+        """
+        if start_date >= end_date:
+            return False
+
+        buffer_days = buffer_hours // 24
+        window_start = start_date.toordinal() - buffer_days
+        window_end = end_date.toordinal() + buffer_days
+
+        # Walk back from the last interval starting before the window end; the first
+        # one (other than the excluded booking) decides because ends are sorted too.
+        idx = bisect_left(self.intervals, [window_end])
+        for start, end, booking_id in reversed(self.intervals[:idx]):
+            if booking_id == exclude_booking_id:
+                continue
+            return end <= window_start
+        return True
+
+    def calendar(self, start_date, days, buffer_hours):
+        """
+        Day-by-day occupancy string for the window: FREE, BOOKED or BUFFER per day.
+        Runs are painted with slice assignment, buffers first so booked nights win where they meet.
+        """
+        origin = start_date.toordinal()
+        buffer_days = buffer_hours // 24
+        cells = bytearray(self.FREE * days)
+
+        # Only intervals whose buffered span reaches into the window
+        first = bisect_right(self.intervals, origin - buffer_days, key=lambda interval: interval[1])
+        last = bisect_left(self.intervals, [origin + days + buffer_days])
+        window = self.intervals[first:last]
+
+        for fill, pad in ((self.BUFFER, buffer_days), (self.BOOKED, 0)):
+            for start, end, _ in window:
+                lo = max(start - pad - origin, 0)
+                hi = min(end + pad - origin, days)
+                if lo < hi:
+                    cells[lo:hi] = fill * (hi - lo)
+
+        return cells.decode()
+
+    def sync_booking(self, booking, deleted=False):
+        """Re-indexes a single booking after it was saved or deleted."""
+        intervals = [interval for interval in self.intervals if interval[2] != booking.pk]
+        if not deleted and booking.unit_id == self.unit_id and booking.status in Booking.ACTIVE_STATUSES:
+            insort(intervals, [booking.start_date.toordinal(), booking.end_date.toordinal(), booking.pk])
+        self.intervals = intervals
+        self.save(update_fields=['intervals', 'updated_at'])
+
+
+class PricingRule(models.Model):
+    """
+    Adjusts the nightly base price of units. Scope is one unit, every unit of a property,
+    or (with neither set) every unit; the most specific matching rule wins, then priority.
+    """
+    TYPE_CHOICES = (
+        ('season', 'Season'),
+        ('weekday', 'Weekday'),
+        ('length_of_stay', 'Length of Stay Discount'),
+    )
+
+    name = models.CharField(max_length=255)
+    rule_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    property = models.ForeignKey('properties.Property', on_delete=models.CASCADE, related_name='pricing_rules', null=True, blank=True)
+    unit = models.ForeignKey('properties.Unit', on_delete=models.CASCADE, related_name='pricing_rules', null=True, blank=True)
+
+    # Price factor for matching nights (season / weekday) or for the whole stay (length of stay)
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3)
+    priority = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    # Season: nights between start_date and end_date (inclusive); only month/day count if repeats_yearly
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    repeats_yearly = models.BooleanField(default=False)
+    # Weekday: comma separated weekday numbers, Monday=0 (e.g. "4,5" for Friday and Saturday nights)
+    weekdays = models.CharField(max_length=13, blank=True, validators=[validate_comma_separated_integer_list])
+    # Length of stay: applies to stays of at least this many nights
+    min_nights = models.PositiveIntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-priority', 'id']
+
+    def clean(self):
+        if self.rule_type == 'season' and not (self.start_date and self.end_date):
+            raise ValidationError("Season rules need a start and end date.")
+        if self.rule_type == 'season' and not self.repeats_yearly and self.start_date > self.end_date:
+            raise ValidationError("Season end date must not be before its start date.")
+        if self.rule_type == 'weekday' and not self.get_weekday_numbers():
+            raise ValidationError("Weekday rules need at least one weekday (0-6).")
+        if self.rule_type == 'length_of_stay' and not self.min_nights:
+            raise ValidationError("Length of stay rules need a minimum number of nights.")
+
+    def get_weekday_numbers(self):
+        return {int(day) for day in self.weekdays.split(',') if day.strip().isdigit() and int(day) < 7}
+
+    def get_scope_rank(self):
+        """Higher is more specific."""
+        if self.unit_id:
+            return 2
+        return 1 if self.property_id else 0
+
+    def __str__(self):
+        return f"{self.name} ({self.get_rule_type_display()} x{self.multiplier})"
@@ -0,0 +1,158 @@
+"""
+Compiled pricing tables.
+
+A unit's active PricingRules are compiled once into per-night rate tables (integer cents,
+one list per calendar year), so quoting a stay is a slice sum instead of rule evaluation.
+Compiled units live in a per-process LRU and are keyed by a rules version kept in the
+Django cache; saving or deleting any PricingRule bumps the version.
+"""
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+import threading
+
+from django.core.cache import cache
+from django.db.models import Q
+
+VERSION_CACHE_KEY = 'pricing:rules_version'
+MAX_COMPILED_UNITS = 1024
+CENT = Decimal('0.01')
+
+_compiled = OrderedDict()
+_lock = threading.Lock()
+
+
+def rules_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, 1, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, 1)
+    return version
+
+
+def invalidate_pricing():
+    """Called when rules change; every process recompiles on its next quote."""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 2, timeout=None)
+
+
+def _to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def _in_season(rule, night):
+    if rule.repeats_yearly:
+        day = (night.month, night.day)
+        start = (rule.start_date.month, rule.start_date.day)
+        end = (rule.end_date.month, rule.end_date.day)
+        # Seasons such as Dec 20 - Jan 5 wrap around the new year
+        return start <= day <= end if start <= end else day >= start or day <= end
+    return rule.start_date <= night <= rule.end_date
+
+
+class CompiledPricing:
+    def __init__(self, base_price, rules):
+        self.base_cents = _to_cents(base_price)
+        # Most specific scope first, then priority: the first match is the one that applies
+        ordered = sorted(rules, key=lambda rule: (-rule.get_scope_rank(), -rule.priority, rule.pk))
+        self.seasons = [rule for rule in ordered if rule.rule_type == 'season']
+        self.weekdays = [(rule, rule.get_weekday_numbers()) for rule in ordered if rule.rule_type == 'weekday']
+        self.stay_discounts = sorted(
+            (rule for rule in ordered if rule.rule_type == 'length_of_stay'),
+            key=lambda rule: (-rule.get_scope_rank(), -rule.priority, -rule.min_nights)
+        )
+        self._years = {}
+
+    def _nightly_cents(self, night):
+        multiplier = Decimal(1)
+        season = next((rule for rule in self.seasons if _in_season(rule, night)), None)
+        if season:
+            multiplier *= season.multiplier
+        weekday = next((rule for rule, days in self.weekdays if night.weekday() in days), None)
+        if weekday:
+            multiplier *= weekday.multiplier
+        return _to_cents(Decimal(self.base_cents) * multiplier / 100)
+
+    def year_table(self, year):
+        """Nightly rates in cents, indexed by day of year - 1."""
+        table = self._years.get(year)
+        if table is None:
+            first = date(year, 1, 1).toordinal()
+            last = date(year, 12, 31).toordinal()
+            table = [self._nightly_cents(date.fromordinal(ordinal)) for ordinal in range(first, last + 1)]
+            self._years[year] = table
+        return table
+
+    def nightly_total_cents(self, start_date, end_date):
+        total = 0
+        ordinal, end = start_date.toordinal(), end_date.toordinal()
+        while ordinal < end:
+            day = date.fromordinal(ordinal)
+            year_start = date(day.year, 1, 1).toordinal()
+            stop = min(end, date(day.year + 1, 1, 1).toordinal())
+            total += sum(self.year_table(day.year)[ordinal - year_start:stop - year_start])
+            ordinal = stop
+        return total
+
+    def stay_discount(self, nights):
+        return next((rule for rule in self.stay_discounts if nights >= rule.min_nights), None)
+
+    def quote(self, start_date, end_date):
+        nights = (end_date - start_date).days
+        subtotal = Decimal(self.nightly_total_cents(start_date, end_date)) / 100
+        discount_rule = self.stay_discount(nights)
+        total = subtotal * discount_rule.multiplier if discount_rule else subtotal
+        return {
+            'nights': nights,
+            'subtotal': subtotal.quantize(CENT),
+            'discount': discount_rule.name if discount_rule else None,
+            'total': total.quantize(CENT, rounding=ROUND_HALF_UP),
+        }
+
+
+def get_units_pricing(units):
+    """
+    Compiled pricing for many units at once, keyed by unit id.
+    Units that are not compiled yet (or are stale) share a single rules query.
+    """
+    version = rules_version()
+    pricings, stale = {}, []
+    with _lock:
+        for unit in units:
+            entry = _compiled.get(unit.pk)
+            if entry and entry[0] == (version, unit.base_price, unit.property_id):
+                _compiled.move_to_end(unit.pk)
+                pricings[unit.pk] = entry[1]
+            else:
+                stale.append(unit)
+
+    if not stale:
+        return pricings
+
+    from .models import PricingRule
+    rules = list(PricingRule.objects.filter(
+        Q(unit_id__in=[unit.pk for unit in stale])
+        | Q(unit=None, property_id__in={unit.property_id for unit in stale})
+        | Q(unit=None, property=None),
+        is_active=True
+    ))
+
+    with _lock:
+        for unit in stale:
+            applicable = [
+                rule for rule in rules
+                if rule.unit_id == unit.pk or (rule.unit_id is None and rule.property_id in (None, unit.property_id))
+            ]
+            pricings[unit.pk] = CompiledPricing(unit.base_price, applicable)
+            _compiled[unit.pk] = ((version, unit.base_price, unit.property_id), pricings[unit.pk])
+            _compiled.move_to_end(unit.pk)
+        while len(_compiled) > MAX_COMPILED_UNITS:
+            _compiled.popitem(last=False)
+    return pricings
+
+
+def get_unit_pricing(unit):
+    """The compiled pricing of a unit, compiling it (one query) if rules or the unit changed."""
+    return get_units_pricing([unit])[unit.pk]
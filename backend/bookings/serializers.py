@@ -3,8 +3,11 @@ from .models import Booking
 from properties.serializers import UnitSerializer
 from users.serializers import UserSerializer
 from billing.serializers import InvoiceSerializer
+from common.serializers import SparseFieldsetMixin
+
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ('unit_details', 'tenant_details', 'invoice')
 
-class BookingSerializer(serializers.ModelSerializer):
     unit_details = UnitSerializer(source='unit', read_only=True)
     tenant_details = UserSerializer(source='tenant', read_only=True)
     invoice = InvoiceSerializer(read_only=True)
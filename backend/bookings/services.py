@@ -1,61 +1,163 @@
-from django.db import transaction
+from django.conf import settings
+from django.db import transaction, connection, IntegrityError
+from django.db.models import Q, Exists, OuterRef, ExpressionWrapper, IntegerField
 from django.core.exceptions import ValidationError
-from datetime import timedelta
-from .models import Booking
-from .tasks import send_booking_confirmation_email
+from django.utils import timezone
+from datetime import timedelta, date
+from decimal import Decimal, InvalidOperation
+from bisect import bisect_left, insort
+from itertools import groupby
+import logging
+from .models import Booking, UnitOccupancy
+from .pricing import get_unit_pricing, get_units_pricing
+from .tasks import process_completed_bookings_task
+from notifications.emails import queue_booking_confirmations
+from notifications.tasks import deliver_pending_emails_task
+from billing.tasks import generate_invoice_for_booking
+
+logger = logging.getLogger(__name__)
 
 def calculate_booking_price(unit, start_date, end_date):
     """
-    Advanced pricing logic. 
-    In a real app, this would check a 'PricingRule' model.
-    Here we'll implement a 'Senior' example: 20% surge during Peak Season (June-August).
+    Prices a stay from the unit's PricingRules (seasons, weekday rates, length-of-stay discounts),
+    compiled once per unit into a nightly rate table.
     """
-    days = (end_date - start_date).days
-    base_price = unit.base_price * days
-    
-    # Peak Season Surge (June, July, August)
-    if start_date.month in [6, 7, 8]:
-        return base_price * 1.20
-    
-    return base_price
+    return get_unit_pricing(unit).quote(start_date, end_date)['total']
 
-def is_unit_available(unit, start_date, end_date, exclude_booking_id=None):
+def is_unit_available(unit, start_date, end_date, exclude_booking_id=None, lock=False):
     """
     Check availability considering the Turnover Buffer.
+    Answered from the unit's occupancy index rather than an overlap query on bookings.
     """
     if start_date >= end_date:
         return False
 
-    buffer_days = (unit.turnover_buffer_hours / 24)
-    buffer_delta = timedelta(days=buffer_days)
+    occupancy = UnitOccupancy.for_unit(unit, lock=lock)
+    return occupancy.is_free(start_date, end_date, unit.turnover_buffer_hours, exclude_booking_id=exclude_booking_id)
 
-    overlapping_bookings = Booking.objects.filter(
-        unit=unit,
-        status__in=['pending', 'confirmed', 'completed'],
-        start_date__lt=end_date + buffer_delta,
-        end_date__gt=start_date - buffer_delta
-    )
+def sync_blocked_until(units):
+    """
+    Recomputes blocked_until for the active bookings of units whose turnover buffer changed.
+    On PostgreSQL a larger buffer can clash with bookings made under the old one: those keep
+    their old value, are logged and their ids are returned.
+    """
+    buffers = {unit.pk: timedelta(days=unit.turnover_buffer_hours // 24) for unit in units}
+    stale = []
+    for booking in Booking.objects.filter(unit__in=buffers, status__in=Booking.ACTIVE_STATUSES).only(
+        'id', 'unit_id', 'end_date', 'blocked_until'
+    ):
+        blocked_until = booking.end_date + buffers[booking.unit_id]
+        if booking.blocked_until != blocked_until:
+            booking.blocked_until = blocked_until
+            stale.append(booking)
+    if not stale:
+        return []
+    try:
+        with transaction.atomic():
+            Booking.objects.bulk_update(stale, ['blocked_until'], batch_size=500)
+        return []
+    except IntegrityError:
+        pass
 
-    if exclude_booking_id:
-        overlapping_bookings = overlapping_bookings.exclude(pk=exclude_booking_id)
+    # Row by row, so only the clashing bookings keep their old buffer
+    skipped = []
+    for booking in stale:
+        try:
+            with transaction.atomic():
+                Booking.objects.filter(pk=booking.pk).update(blocked_until=booking.blocked_until)
+        except IntegrityError:
+            skipped.append(booking.pk)
+    if skipped:
+        logger.warning("Turnover buffer clash: bookings %s keep their previous blocked_until", skipped)
+    return skipped
 
-    return not overlapping_bookings.exists()
+def quote_units(units, date_ranges):
+    """
+    Prices every unit for every (start_date, end_date) range in one pass.
+    Rules for all units are compiled together, so a cold batch costs a single rules query.
+    """
+    pricings = get_units_pricing(units)
+    quotes = []
+    for unit in units:
+        pricing = pricings[unit.pk]
+        for start_date, end_date in date_ranges:
+            quotes.append({'unit': unit.pk, 'start_date': start_date, 'end_date': end_date, **pricing.quote(start_date, end_date)})
+    return quotes
 
-@transaction.atomic
-def create_booking(user, unit, start_date, end_date):
+def get_occupancy_calendar(unit, start_date, days, run_length=True):
     """
-    Safely creates a booking with concurrency protection.
+    Occupancy of a unit for `days` days from start_date, from a single index fetch.
+    Encoded as [state, length] runs, or as one character per day.
     """
-    # Use select_for_update on the unit to prevent race conditions during availability check
-    from properties.models import Unit
-    Unit.objects.select_for_update().get(pk=unit.pk)
+    occupancy = UnitOccupancy.for_unit(unit)
+    cells = occupancy.calendar(start_date, days, unit.turnover_buffer_hours)
 
-    if not is_unit_available(unit, start_date, end_date):
-        raise ValidationError(f"This unit is not available for these dates (Turnover buffer of {unit.turnover_buffer_hours}h required).")
+    calendar = {
+        'unit': unit.pk,
+        'start_date': start_date,
+        'days': days,
+        'legend': {
+            UnitOccupancy.FREE.decode(): 'free',
+            UnitOccupancy.BOOKED.decode(): 'booked',
+            UnitOccupancy.BUFFER.decode(): 'buffer',
+        },
+    }
+    if run_length:
+        calendar['runs'] = [[state, sum(1 for _ in run)] for state, run in groupby(cells)]
+    else:
+        calendar['calendar'] = cells
 
-    total_price = calculate_booking_price(unit, start_date, end_date)
+    # The index row changes whenever one of the unit's bookings does
+    calendar['version'] = f"{occupancy.updated_at.timestamp()}:{unit.turnover_buffer_hours}"
+    return calendar
+
+def filter_available_units(units, start_date, end_date):
+    """
+    Narrows a Unit queryset to the units free for the whole range, as a single anti-join.
+    Each unit's own turnover buffer is applied: units sharing a buffer (in whole days)
+    share one branch of the conflict predicate, so every date comparison is against a constant.
+    """
+    if start_date >= end_date:
+        return units.none()
+
+    buffer_days = {
+        hours // 24 for hours in units.order_by().values_list('turnover_buffer_hours', flat=True).distinct()
+    }
+
+    conflict = Q(pk__in=[])
+    for days in buffer_days:
+        delta = timedelta(days=days)
+        conflict |= Q(
+            unit_buffer_hours__gte=days * 24,
+            unit_buffer_hours__lt=(days + 1) * 24,
+            start_date__lt=end_date + delta,
+            end_date__gt=start_date - delta
+        )
 
-    booking = Booking.objects.create(
+    clashing_bookings = Booking.objects.filter(
+        unit=OuterRef('pk'),
+        status__in=Booking.ACTIVE_STATUSES
+    ).annotate(
+        unit_buffer_hours=ExpressionWrapper(OuterRef('turnover_buffer_hours'), output_field=IntegerField())
+    ).filter(conflict)
+
+    return units.filter(~Exists(clashing_bookings))
+
+def uses_exclusion_engine(engine=None):
+    """The exclusion engine needs the PostgreSQL constraint; everywhere else the unit lock is used."""
+    engine = engine or settings.BOOKING_ENGINE
+    return engine == 'exclusion' and connection.vendor == 'postgresql'
+
+@transaction.atomic
+def create_booking(user, unit, start_date, end_date, engine=None, notify=True):
+    """
+    Safely creates a booking with concurrency protection.
+    'lock' engine: serializes attempts through a row lock on the unit.
+    'exclusion' engine (PostgreSQL): no lock; the booking_no_overlap constraint rejects conflicting inserts.
+    """
+    unavailable = f"This unit is not available for these dates (Turnover buffer of {unit.turnover_buffer_hours}h required)."
+    total_price = calculate_booking_price(unit, start_date, end_date)
+    booking = Booking(
         tenant=user,
         unit=unit,
         start_date=start_date,
@@ -63,7 +165,190 @@ def create_booking(user, unit, start_date, end_date):
         total_price=total_price,
         status='pending'
     )
+
+    if uses_exclusion_engine(engine):
+        # Cheap pre-check from the index turns most conflicts away before touching the table
+        if not is_unit_available(unit, start_date, end_date):
+            raise ValidationError(unavailable)
+
+        # The index row is re-synced after commit so it never becomes a lock of its own
+        booking._defer_occupancy_sync = True
+        try:
+            with transaction.atomic():
+                booking.save(check_overlap=False)
+        except IntegrityError:
+            raise ValidationError(unavailable)
+    else:
+        # Use select_for_update on the unit to prevent race conditions during availability check
+        from properties.models import Unit
+        Unit.objects.select_for_update().get(pk=unit.pk)
+
+        # The occupancy row is locked as well so index updates stay serialized with this check
+        if not is_unit_available(unit, start_date, end_date, lock=True):
+            raise ValidationError(unavailable)
+
+        booking.save(check_overlap=False)
+
+    if notify:
+        # Queued in this transaction so the email exists exactly when the booking does
+        queue_booking_confirmations([booking.pk])
+        transaction.on_commit(deliver_pending_emails_task.delay)
     
-    transaction.on_commit(lambda: send_booking_confirmation_email.delay(booking.id))
-    
-    return booking
\ No newline at end of file
+    return booking
+
+
+def _parse_import_row(row):
+    """Turns one raw import row (strings or native values) into typed fields plus a list of errors."""
+    errors = []
+    parsed = {}
+
+    for field in ('unit', 'tenant'):
+        try:
+            parsed[field] = int(row.get(field))
+        except (TypeError, ValueError):
+            errors.append(f"{field}: a numeric id is required.")
+
+    for field in ('start_date', 'end_date'):
+        value = row.get(field)
+        try:
+            parsed[field] = value if isinstance(value, date) else date.fromisoformat(str(value))
+        except ValueError:
+            errors.append(f"{field}: expected YYYY-MM-DD.")
+
+    if not errors and parsed['start_date'] >= parsed['end_date']:
+        errors.append("End date must be after start date.")
+
+    parsed['status'] = row.get('status') or 'pending'
+    if not isinstance(parsed['status'], str) or parsed['status'] not in dict(Booking.STATUS_CHOICES):
+        errors.append(f"status: '{parsed['status']}' is not a valid choice.")
+
+    parsed['total_price'] = None
+    if row.get('total_price') not in (None, ''):
+        field = Booking._meta.get_field('total_price')
+        try:
+            parsed['total_price'] = Decimal(str(row['total_price']))
+            price = parsed['total_price']
+            # NaN / Infinity parse as decimals but cannot be stored
+            if (not price.is_finite() or price < 0 or price.as_tuple().exponent < -field.decimal_places
+                    or price >= Decimal(10) ** (field.max_digits - field.decimal_places)):
+                raise InvalidOperation
+        except InvalidOperation:
+            errors.append(
+                f"total_price: a non-negative amount with at most {field.max_digits - field.decimal_places} "
+                f"digits before and {field.decimal_places} after the point is required."
+            )
+
+    return parsed, errors
+
+@transaction.atomic
+def import_bookings(rows, owner=None, notify=False, generate_invoices=False, dry_run=False, batch_size=1000):
+    """
+    Validates a whole batch of bookings in memory and inserts the valid ones with bulk_create.
+    Overlaps and turnover buffer violations are checked per unit against existing bookings
+    and against earlier rows of the same batch. Emails and invoices are opt-in.
+    If owner is given, rows for units of other landlords are rejected.
+    Returns {'created': n, 'errors': [{'row': index, 'errors': [...]}]}.
+    """
+    from properties.models import Unit
+    from users.models import User
+
+    parsed_rows = []
+    row_errors = {}
+    for index, row in enumerate(rows):
+        parsed, errors = _parse_import_row(row) if isinstance(row, dict) else ({}, ["Expected an object."])
+        if errors:
+            row_errors[index] = errors
+        else:
+            parsed_rows.append((index, parsed))
+
+    # Lock the affected units like create_booking does, then load everything in a few queries
+    unit_ids = {parsed['unit'] for _, parsed in parsed_rows}
+    units = {unit.pk: unit for unit in Unit.objects.select_for_update().select_related('property').filter(pk__in=unit_ids)}
+    tenant_ids = set(User.objects.filter(pk__in={parsed['tenant'] for _, parsed in parsed_rows}).values_list('pk', flat=True))
+
+    # Per-unit sorted, disjoint [start, end + buffer) ordinal spans of active bookings
+    spans = {unit_id: [] for unit_id in units}
+    for unit_id, start, end in Booking.objects.filter(
+        unit_id__in=units, status__in=Booking.ACTIVE_STATUSES
+    ).values_list('unit_id', 'start_date', 'end_date'):
+        buffer_days = units[unit_id].turnover_buffer_hours // 24
+        insort(spans[unit_id], (start.toordinal(), end.toordinal() + buffer_days))
+
+    bookings = []
+    for index, parsed in sorted(parsed_rows, key=lambda item: (item[1]['unit'], item[1]['start_date'])):
+        unit = units.get(parsed['unit'])
+        if unit is None:
+            row_errors[index] = ["unit: does not exist."]
+            continue
+        if owner is not None and unit.property.owner_id != owner.pk:
+            row_errors[index] = ["unit: not your property."]
+            continue
+        if parsed['tenant'] not in tenant_ids:
+            row_errors[index] = ["tenant: does not exist."]
+            continue
+
+        if parsed['status'] in Booking.ACTIVE_STATUSES:
+            buffer_days = unit.turnover_buffer_hours // 24
+            span = (parsed['start_date'].toordinal(), parsed['end_date'].toordinal() + buffer_days)
+            unit_spans = spans[unit.pk]
+            idx = bisect_left(unit_spans, (span[1],))
+            if idx and unit_spans[idx - 1][1] > span[0]:
+                row_errors[index] = [f"This unit is unavailable. Turnover buffer of {unit.turnover_buffer_hours}h required."]
+                continue
+            unit_spans.insert(idx, span)
+
+        bookings.append(Booking(
+            unit=unit,
+            tenant_id=parsed['tenant'],
+            start_date=parsed['start_date'],
+            end_date=parsed['end_date'],
+            status=parsed['status'],
+            total_price=parsed['total_price'] if parsed['total_price'] is not None else calculate_booking_price(unit, parsed['start_date'], parsed['end_date']),
+            blocked_until=parsed['end_date'] + timedelta(days=unit.turnover_buffer_hours // 24),
+        ))
+
+    report = {
+        'created': 0 if dry_run else len(bookings),
+        'errors': [{'row': index, 'errors': errors} for index, errors in sorted(row_errors.items())],
+    }
+    if dry_run or not bookings:
+        return report
+
+    # bulk_create bypasses save() and signals, so the side effects are replayed in bulk
+    created = Booking.objects.bulk_create(bookings, batch_size=batch_size)
+    for unit_id in {booking.unit_id for booking in created}:
+        UnitOccupancy.for_unit(units[unit_id], lock=True).rebuild()
+
+    if notify:
+        queue_booking_confirmations([booking.pk for booking in created])
+        transaction.on_commit(deliver_pending_emails_task.delay)
+    if generate_invoices:
+        confirmed_ids = [booking.pk for booking in created if booking.status == 'confirmed']
+        transaction.on_commit(lambda: [generate_invoice_for_booking.delay(pk) for pk in confirmed_ids])
+
+    return report
+
+
+def complete_finished_bookings(today=None, batch_size=500):
+    """
+    Moves confirmed bookings whose stay has ended to 'completed' with one UPDATE per batch.
+    Saves and signals are skipped on purpose: completed bookings count in the occupancy index
+    and the revenue rollup exactly like confirmed ones. Each batch's downstream work is
+    enqueued as a single task once the batch commits. Returns the number completed.
+    """
+    today = today or timezone.localdate()
+    completed = 0
+    while True:
+        with transaction.atomic():
+            # SKIP LOCKED lets overlapping sweeps take disjoint batches
+            ids = list(
+                Booking.objects.filter(status='confirmed', end_date__lt=today)
+                .order_by('end_date').select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if ids:
+                Booking.objects.filter(pk__in=ids).update(status='completed', updated_at=timezone.now())
+                transaction.on_commit(lambda ids=ids: process_completed_bookings_task.delay(ids))
+        completed += len(ids)
+        if len(ids) < batch_size:
+            return completed
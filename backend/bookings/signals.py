@@ -1,28 +1,70 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Booking
+from properties.models import Unit
+from .models import Booking, UnitOccupancy, PricingRule
+from .pricing import invalidate_pricing
+from .services import sync_blocked_until
+from common.cache import invalidate_public
 from billing.tasks import generate_invoice_for_booking # Import the task
 
 @receiver(post_save, sender=Booking)
 def booking_post_save(sender, instance, created, **kwargs):
-    if not created and instance.status == 'confirmed' and instance._original_status != 'confirmed':
-        # Status changed to confirmed, and it was not confirmed before
-        generate_invoice_for_booking.delay(instance.id)
-    
-    # Store the original status for the next save
-    instance._original_status = instance.status
+    # Status changed to confirmed, and it was not confirmed before (no re-fetch: the
+    # change-tracking snapshot holds the status the row was loaded with)
+    if not created and instance.status == 'confirmed' and instance.previous('status') != 'confirmed':
+        booking_id = instance.id
+        transaction.on_commit(lambda: generate_invoice_for_booking.delay(booking_id))
 
-# We need to save the original status before a change
-# This requires overriding the save method or using a pre_save signal.
-# I'll use pre_save signal to store the original status.
-from django.db.models.signals import pre_save
+def _sync_occupancy(booking, deleted=False):
+    with transaction.atomic():
+        UnitOccupancy.for_unit(booking.unit, lock=True).sync_booking(booking, deleted=deleted)
 
-@receiver(pre_save, sender=Booking)
-def booking_pre_save(sender, instance, **kwargs):
-    if instance.pk: # Only on existing objects
-        try:
-            instance._original_status = Booking.objects.get(pk=instance.pk).status
-        except Booking.DoesNotExist:
-            instance._original_status = None # New object being saved for the first time
+@receiver(post_save, sender=Booking)
+def booking_occupancy_post_save(sender, instance, created, **kwargs):
+    if not created and not any(instance.has_changed(field) for field in Booking.tracked_fields):
+        return
+    previous_unit_id = instance.previous('unit')
+    if not created and previous_unit_id and previous_unit_id != instance.unit_id:
+        # Moved to another unit: drop it from the old unit's index
+        with transaction.atomic():
+            occupancy = UnitOccupancy.objects.select_for_update().filter(unit_id=previous_unit_id).first()
+            if occupancy:
+                occupancy.sync_booking(instance, deleted=True)
+    if not instance.unit_id:
+        return
+    if getattr(instance, '_defer_occupancy_sync', False):
+        transaction.on_commit(lambda: _sync_occupancy(instance))
     else:
-        instance._original_status = None # New object
+        _sync_occupancy(instance)
+
+@receiver(post_delete, sender=Booking)
+def booking_occupancy_post_delete(sender, instance, **kwargs):
+    # The unit (and its index) may be going away in the same cascade
+    with transaction.atomic():
+        occupancy = UnitOccupancy.objects.select_for_update().filter(unit_id=instance.unit_id).first()
+        if occupancy:
+            occupancy.sync_booking(instance, deleted=True)
+
+@receiver(post_save, sender=Unit)
+def unit_post_save(sender, instance, created, update_fields=None, **kwargs):
+    """Keeps blocked_until in step with the unit's turnover buffer."""
+    if created or not instance.has_changed('turnover_buffer_hours'):
+        return
+    if update_fields is not None and 'turnover_buffer_hours' not in update_fields:
+        return
+    # Read back by UnitViewSet.update, which reports them to the caller
+    instance.buffer_clashes = sync_blocked_until([instance])
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def pricing_rule_changed(sender, instance, **kwargs):
+    # Again after commit, in case another process recompiled from the pre-commit rules
+    invalidate_pricing()
+    transaction.on_commit(invalidate_pricing)
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed_public_cache(sender, instance, **kwargs):
+    # Only the date-filtered unit search depends on bookings
+    invalidate_public('availability')
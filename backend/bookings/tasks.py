@@ -1,20 +1,31 @@
 from celery import shared_task
-import time
 
 @shared_task
 def send_booking_confirmation_email(booking_id):
     """
-    Simulates sending an email confirmation.
-    In a real app, this would use django.core.mail.
+    Queues the confirmation email of a booking and flushes the outbox.
+    Booking services queue in their own transaction instead and only enqueue the flush.
     """
+    from notifications.emails import queue_booking_confirmations, deliver_pending_emails
+    queued = queue_booking_confirmations([booking_id])
+    deliver_pending_emails()
+    return bool(queued)
+
+@shared_task
+def complete_finished_bookings_task():
+    from .services import complete_finished_bookings
+    return complete_finished_bookings()
+
+@shared_task
+def process_completed_bookings_task(booking_ids):
+    """Downstream effects of a batch of completed stays: landlord payouts and one notification per landlord."""
+    from django.db.models import Count
+    from billing.services import record_stay_payouts
+    from notifications.utils import send_notification
     from .models import Booking
-    try:
-        booking = Booking.objects.get(id=booking_id)
-        print(f"Sending confirmation email for Booking {booking_id} to {booking.tenant.email}")
-        # Simulate network delay
-        time.sleep(5)
-        print(f"Email sent successfully for Booking {booking_id}")
-        return True
-    except Booking.DoesNotExist:
-        print(f"Booking {booking_id} does not exist. Task failed.")
-        return False
+
+    payouts = record_stay_payouts(booking_ids)
+    per_owner = Booking.objects.filter(pk__in=booking_ids).values_list('unit__property__owner_id').order_by().annotate(Count('pk'))
+    for owner_id, count in per_owner:
+        send_notification(owner_id, f"{count} stay(s) completed", 'info')
+    return payouts
@@ -2,9 +2,11 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 from properties.models import Property, Unit
-from .models import Booking
-from .services import is_unit_available, create_booking
+from .models import Booking, UnitOccupancy, PricingRule
+from .services import is_unit_available, create_booking, import_bookings, calculate_booking_price
 
 User = get_user_model()
 
@@ -80,3 +82,358 @@ class BookingLogicTest(TestCase):
         self.existing_booking.status = 'cancelled'
         self.existing_booking.save()
         self.assertTrue(is_unit_available(self.unit, date(2026, 2, 10), date(2026, 2, 15)))
+
+    def test_occupancy_index_tracks_status_changes(self):
+        occupancy = UnitOccupancy.objects.get(unit=self.unit)
+        self.assertEqual(len(occupancy.intervals), 1)
+
+        self.existing_booking.status = 'cancelled'
+        self.existing_booking.save()
+        occupancy.refresh_from_db()
+        self.assertEqual(occupancy.intervals, [])
+
+        self.existing_booking.delete()
+        self.assertTrue(is_unit_available(self.unit, date(2026, 2, 10), date(2026, 2, 15)))
+
+    def test_occupancy_index_applies_buffer(self):
+        self.unit.turnover_buffer_hours = 48
+        self.unit.save()
+        # Two-day buffer on each side of Feb 10 - Feb 15
+        self.assertFalse(is_unit_available(self.unit, date(2026, 2, 5), date(2026, 2, 9)))
+        self.assertFalse(is_unit_available(self.unit, date(2026, 2, 16), date(2026, 2, 20)))
+        self.assertTrue(is_unit_available(self.unit, date(2026, 2, 5), date(2026, 2, 8)))
+        self.assertTrue(is_unit_available(self.unit, date(2026, 2, 17), date(2026, 2, 20)))
+        # A booking never blocks itself
+        self.assertTrue(is_unit_available(self.unit, date(2026, 2, 10), date(2026, 2, 15), exclude_booking_id=self.existing_booking.pk))
+
+    def test_availability_check_is_single_query(self):
+        with self.assertNumQueries(1):
+            is_unit_available(self.unit, date(2026, 2, 11), date(2026, 2, 14))
+
+    def test_occupancy_index_rebuilt_lazily(self):
+        UnitOccupancy.objects.all().delete()
+        self.assertFalse(is_unit_available(self.unit, date(2026, 2, 11), date(2026, 2, 14)))
+        self.assertTrue(UnitOccupancy.objects.filter(unit=self.unit).exists())
+
+    def test_blocked_until_follows_unit_buffer(self):
+        self.assertEqual(self.existing_booking.blocked_until, date(2026, 2, 15))
+        self.unit.turnover_buffer_hours = 72
+        self.unit.save()
+        self.existing_booking.refresh_from_db()
+        self.assertEqual(self.existing_booking.blocked_until, date(2026, 2, 18))
+
+        # Clashing bookings are reported by the unit update API
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+        with mock.patch('bookings.signals.sync_blocked_until', return_value=[self.existing_booking.id]):
+            response = client.patch(f'/api/v1/units/{self.unit.id}/', {'turnover_buffer_hours': 96}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['buffer_clashes'], [self.existing_booking.id])
+        response = client.patch(f'/api/v1/units/{self.unit.id}/', {'title': 'Suite'}, format='json')
+        self.assertEqual(response.data['buffer_clashes'], [])
+
+        # Saves that leave the buffer alone do not touch the unit's bookings
+        with mock.patch('bookings.signals.sync_blocked_until') as sync:
+            self.unit.title = 'Renamed'
+            self.unit.save()
+            Unit.objects.get(pk=self.unit.pk).save()
+        sync.assert_not_called()
+
+    def test_exclusion_engine_falls_back_to_lock_off_postgres(self):
+        with self.assertRaises(ValidationError):
+            create_booking(self.tenant, self.unit, date(2026, 2, 12), date(2026, 2, 18), engine='exclusion')
+        booking = create_booking(self.tenant, self.unit, date(2026, 2, 20), date(2026, 2, 22), engine='exclusion')
+        self.assertEqual(booking.blocked_until, date(2026, 2, 22))
+
+    def test_bulk_import_reports_conflicts_per_row(self):
+        rows = [
+            {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': '2026-03-01', 'end_date': '2026-03-05'},
+            # Clashes with the existing Feb 10-15 booking
+            {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': '2026-02-12', 'end_date': '2026-02-14'},
+            # Clashes with row 0 of the same batch
+            {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': '2026-03-04', 'end_date': '2026-03-06'},
+            # Cancelled rows never clash
+            {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': '2026-03-04', 'end_date': '2026-03-06', 'status': 'cancelled'},
+            {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': 'soon', 'end_date': '2026-03-06'},
+            {'unit': 999, 'tenant': self.tenant.id, 'start_date': '2026-03-04', 'end_date': '2026-03-06'},
+        ]
+        report = import_bookings(rows)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [1, 2, 4, 5])
+        self.assertEqual(Booking.objects.count(), 3)
+        # The occupancy index picked up the imported booking
+        self.assertFalse(is_unit_available(self.unit, date(2026, 3, 2), date(2026, 3, 3)))
+
+    def test_bulk_import_rejects_malformed_rows(self):
+        base = {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': '2026-03-01', 'end_date': '2026-03-05'}
+        rows = [1, {**base, 'status': ['x']}, {**base, 'total_price': 'NaN'}, {**base, 'total_price': 'Infinity'},
+                {**base, 'total_price': '-5'}, {**base, 'total_price': '1.005'}, {**base, 'total_price': '1e9'}]
+        report = import_bookings(rows)
+        self.assertEqual(report['created'], 0)
+        self.assertEqual([error['row'] for error in report['errors']], list(range(len(rows))))
+        self.assertEqual(report['errors'][0]['errors'], ['Expected an object.'])
+
+    def test_bulk_import_api_is_owner_scoped(self):
+        from rest_framework.test import APIClient
+        other = User.objects.create_user(username='other', password='pass', role='landlord')
+        client = APIClient()
+        client.force_authenticate(user=other)
+        rows = [{'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': '2026-03-01', 'end_date': '2026-03-05'}]
+        response = client.post('/api/v1/bookings/bulk_import/', {'bookings': rows}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['errors'][0]['errors'], ['unit: not your property.'])
+
+        client.force_authenticate(user=self.landlord)
+        # String flags from form-style clients: "false" is not a dry run
+        response = client.post('/api/v1/bookings/bulk_import/', {'bookings': rows, 'dry_run': 'false'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+
+    def test_list_uses_cursor_pagination_with_page_number_fallback(self):
+        from rest_framework.test import APIClient
+        for day in range(1, 6):
+            Booking.objects.create(
+                unit=self.unit, tenant=self.tenant, status='pending',
+                start_date=date(2026, 4, day * 3), end_date=date(2026, 4, day * 3 + 1)
+            )
+        client = APIClient()
+        client.force_authenticate(user=self.tenant)
+
+        seen, url = [], '/api/v1/bookings/?page_size=2'
+        while url:
+            response = client.get(url)
+            self.assertNotIn('count', response.data)
+            seen += [booking['id'] for booking in response.data['results']]
+            url = response.data['next']
+        expected = list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+        response = client.get('/api/v1/bookings/', {'page': 1})
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual([booking['id'] for booking in response.data['results']], expected)
+
+    def test_sparse_fieldsets_trim_output_and_queries(self):
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+
+        full = client.get('/api/v1/bookings/').data['results'][0]
+        self.assertIn('unit_details', full)
+
+        # The ETag aggregate, then the page itself
+        with self.assertNumQueries(2):
+            flat = client.get('/api/v1/bookings/', {'expand': ''}).data['results'][0]
+        self.assertNotIn('unit_details', flat)
+        self.assertNotIn('invoice', flat)
+        self.assertEqual(flat['unit'], self.unit.id)
+
+        response = client.get('/api/v1/bookings/', {'fields': 'id,status,tenant_details'})
+        self.assertEqual(
+            response.data['results'][0],
+            {'id': self.existing_booking.id, 'status': 'confirmed', 'tenant_details': full['tenant_details']}
+        )
+
+        response = client.get('/api/v1/properties/', {'expand': 'units', 'fields': 'id,title,units'})
+        prop = response.data['results'][0]
+        self.assertEqual(set(prop), {'id', 'title', 'units'})
+        self.assertEqual(prop['units'][0]['unit_number'], '101')
+
+    def test_conditional_get(self):
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+
+        response = client.get('/api/v1/bookings/')
+        etag = response['ETag']
+        # Validators are checked before anything is serialized
+        with self.assertNumQueries(1):
+            response = client.get('/api/v1/bookings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Another page or field set is another representation
+        self.assertEqual(client.get('/api/v1/bookings/', {'expand': ''}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Nested unit details changed
+        self.unit.title = 'Renamed'
+        self.unit.save()
+        self.assertEqual(client.get('/api/v1/bookings/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Deleting a row changes the list's ETag; lists send no Last-Modified, which could not see it
+        extra = Booking.objects.create(
+            unit=self.unit, tenant=self.tenant, start_date=date(2026, 4, 1), end_date=date(2026, 4, 3), status='pending'
+        )
+        response = client.get('/api/v1/bookings/')
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        extra.delete()
+        self.assertEqual(client.get('/api/v1/bookings/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        url = f'/api/v1/bookings/{self.existing_booking.id}/'
+        response = client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.existing_booking.save()
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_occupancy_analytics(self):
+        from rest_framework.test import APIClient
+        unit2 = Unit.objects.create(property=self.property, title='Unit 2', unit_number='102', base_price=100)
+        # 4 nights at 100, two of which fall in January
+        Booking.objects.create(
+            unit=unit2, tenant=self.tenant, start_date=date(2026, 1, 30), end_date=date(2026, 2, 3),
+            status='completed', total_price=400
+        )
+        Booking.objects.create(
+            unit=unit2, tenant=self.tenant, start_date=date(2026, 2, 20), end_date=date(2026, 2, 25), status='pending'
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.landlord)
+
+        data = client.get('/api/v1/bookings/analytics/', {'start_date': '2026-01-15', 'end_date': '2026-03-01'}).data
+        self.assertEqual(data['totals'], {
+            'available_nights': 90, 'occupied_nights': 9, 'occupancy_rate': 0.1,
+            'revenue': 900.0, 'adr': 100.0, 'revpar': 10.0,
+        })
+        january, february = data['months']
+        self.assertEqual((january['month'], january['available_nights'], january['occupied_nights'], january['revenue']), ('2026-01', 34, 2, 200.0))
+        self.assertEqual((february['available_nights'], february['occupied_nights'], february['revenue']), (56, 7, 700.0))
+        units = {unit['unit_number']: unit for unit in data['units']}
+        self.assertEqual((units['101']['occupied_nights'], units['101']['revpar']), (5, 11.11))
+        self.assertEqual(units['102']['occupancy_rate'], round(4 / 45, 4))
+        self.assertEqual(data['properties'][0]['months'][1]['occupied_nights'], 7)
+
+        response = client.get('/api/v1/bookings/analytics/', {'start_date': '2026-03-01', 'end_date': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_confirmation_emails_are_batched_over_one_connection(self):
+        from unittest import mock
+        from django.core import mail
+        from notifications import emails
+        from notifications.models import OutgoingEmail
+        self.tenant.email = 'tenant@example.com'
+        self.tenant.first_name = "O'Brien"
+        self.tenant.save()
+        self.property.title = 'Bed & Breakfast'
+        self.property.save()
+
+        create_booking(self.tenant, self.unit, date(2026, 5, 1), date(2026, 5, 4))
+        rows = [
+            {'unit': self.unit.id, 'tenant': self.tenant.id, 'start_date': f'2026-06-{day:02d}', 'end_date': f'2026-06-{day + 1:02d}'}
+            for day in (1, 5, 9, 13)
+        ]
+        import_bookings(rows, notify=True)
+        self.assertEqual(OutgoingEmail.objects.filter(status='pending').count(), 5)
+
+        with mock.patch('notifications.emails.get_connection', wraps=emails.get_connection) as get_connection:
+            self.assertEqual(emails.deliver_pending_emails(batch_size=2), 5)
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn('Test Unit (101)', mail.outbox[0].subject)
+        self.assertIn('2026-05-01', mail.outbox[0].body)
+        # Plain-text parts are not HTML-escaped, and a pending booking is only "received"
+        self.assertEqual(mail.outbox[0].subject, 'Booking received: Test Unit (101) at Bed & Breakfast')
+        self.assertIn("Hi O'Brien,", mail.outbox[0].body)
+        self.assertIn('pending until the landlord confirms it', mail.outbox[0].body)
+        self.assertFalse(OutgoingEmail.objects.exclude(status='sent').exists())
+
+    def test_failed_emails_back_off(self):
+        from smtplib import SMTPException
+        from unittest import mock
+        from django.utils import timezone
+        from notifications import emails
+        from notifications.models import OutgoingEmail
+        email = emails.queue_email('booking_confirmation', 'tenant@example.com', {'booking_id': 1})
+
+        with mock.patch('notifications.emails.EmailMultiAlternatives.send', side_effect=SMTPException('down')):
+            self.assertEqual(emails.deliver_pending_emails(), 0)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        # Not due yet, so not retried
+        self.assertEqual(emails.deliver_pending_emails(), 0)
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now(), attempts=emails.MAX_ATTEMPTS - 1)
+        with mock.patch('notifications.emails.EmailMultiAlternatives.send', side_effect=SMTPException('down')):
+            emails.deliver_pending_emails()
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+
+
+class PricingRuleTest(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.property = Property.objects.create(owner=self.landlord, title='Test Property', address='Test Addr')
+        self.unit = Unit.objects.create(
+            property=self.property, title='Test Unit', unit_number='101', base_price=Decimal('100.00')
+        )
+
+    def test_peak_season_applies_per_night(self):
+        # Migrated Jun-Aug surge: May 30 and 31 at base, Jun 1 and 2 at +20%
+        self.assertEqual(calculate_booking_price(self.unit, date(2026, 5, 30), date(2026, 6, 3)), Decimal('440.00'))
+
+    def test_weekday_discount_and_unit_override(self):
+        PricingRule.objects.create(name='Weekend', rule_type='weekday', weekdays='4,5', multiplier=Decimal('1.5'))
+        PricingRule.objects.create(
+            name='Long stay', rule_type='length_of_stay', min_nights=7, multiplier=Decimal('0.9'),
+            property=self.property
+        )
+        # Mon Mar 2 - Mon Mar 9 2026: Fri and Sat at 150, five nights at 100, then 10% off
+        self.assertEqual(calculate_booking_price(self.unit, date(2026, 3, 2), date(2026, 3, 9)), Decimal('720.00'))
+
+        PricingRule.objects.create(
+            name='Unit weekend', rule_type='weekday', weekdays='4,5', multiplier=Decimal('1.0'), unit=self.unit
+        )
+        self.assertEqual(calculate_booking_price(self.unit, date(2026, 3, 2), date(2026, 3, 9)), Decimal('630.00'))
+
+    def test_rules_compiled_once_per_unit(self):
+        calculate_booking_price(self.unit, date(2026, 3, 2), date(2026, 3, 9))
+        with self.assertNumQueries(0):
+            calculate_booking_price(self.unit, date(2026, 12, 20), date(2027, 1, 10))
+            calculate_booking_price(self.unit, date(2026, 3, 2), date(2026, 3, 5))
+
+    def test_booking_and_invoice_use_rules(self):
+        from billing.tasks import generate_invoice_for_booking
+        tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        booking = create_booking(tenant, self.unit, date(2026, 7, 1), date(2026, 7, 3))
+        self.assertEqual(booking.total_price, Decimal('240.00'))
+        generate_invoice_for_booking(booking.id)
+        booking.refresh_from_db()
+        self.assertEqual(booking.invoice.amount, Decimal('240.00'))
+
+
+class BookingChangeTrackingTest(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.property = Property.objects.create(owner=self.landlord, title='Test Property', address='Test Addr')
+        self.unit = Unit.objects.create(
+            property=self.property, title='Test Unit', unit_number='101', base_price=Decimal('100.00')
+        )
+        booking = Booking.objects.create(
+            unit=self.unit, tenant=self.tenant, start_date=date(2026, 2, 10), end_date=date(2026, 2, 15)
+        )
+        self.booking = Booking.objects.select_related('unit').get(pk=booking.pk)
+
+    def test_previous_and_has_changed(self):
+        self.assertFalse(self.booking.has_changed('status'))
+        self.booking.status = 'confirmed'
+        self.assertTrue(self.booking.has_changed('status'))
+        self.assertEqual(self.booking.previous('status'), 'pending')
+        self.assertEqual(self.booking.changed_fields(), ['status'])
+        self.booking.save()
+        self.assertFalse(self.booking.has_changed('status'))
+        self.assertEqual(self.booking.previous('status'), 'confirmed')
+
+    def test_confirmation_enqueues_invoice_once_without_refetch(self):
+        from unittest import mock
+        with mock.patch('bookings.signals.generate_invoice_for_booking') as task:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.booking.status = 'confirmed'
+                self.booking.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                # Unrelated edit: no invoice, no occupancy re-sync
+                self.booking.total_price = Decimal('450.00')
+                with self.assertNumQueries(1):
+                    self.booking.save()
+        task.delay.assert_called_once_with(self.booking.pk)
@@ -1,33 +1,42 @@
 from rest_framework import viewsets, permissions, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Sum
-from django.db.models.functions import ExtractMonth, ExtractYear
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.http import StreamingHttpResponse
-import csv
 from .models import Booking
 from .serializers import BookingSerializer
-from .services import create_booking
-
-class Echo:
-    """An object that implements just the write method of the file-like interface."""
-    def write(self, value):
-        """Write the value by returning it, instead of storing in a buffer."""
-        return value
-
-class BookingViewSet(viewsets.ModelViewSet):
+from .services import create_booking, import_bookings
+from .analytics import occupancy_analytics, MAX_WINDOW_DAYS
+from datetime import datetime
+from billing.services import rollup_monthly_revenue, verify_revenue_rollup
+from billing.exports import CHUNK_SIZE, EXPORTS, export_headers, stream_csv
+from common.pagination import CursorOrPageNumberPagination
+from common.views import ConditionalGetMixin, SparseFieldsetViewMixin
+
+class BookingViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
+    # Nested unit and invoice details change without touching the booking
+    conditional_related_fields = ('unit__updated_at', 'invoice__updated_at')
+    field_select_related = {
+        'unit_details': ['unit__property'],
+        'tenant_details': ['tenant'],
+        'invoice': ['invoice'],
+    }
+    field_prefetch_related = {
+        'unit_details': ['unit__images'],
+    }
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Booking.objects.all()
+            return self.with_requested_relations(Booking.objects.all())
         # Tenant sees their bookings, Landlord sees bookings for their units
-        return Booking.objects.filter(
+        return self.with_requested_relations(Booking.objects.filter(
             Q(tenant=user) | Q(unit__property__owner=user)
-        ).select_related('unit__property', 'tenant', 'invoice')
+        ))
 
     def perform_create(self, serializer):
         try:
@@ -40,6 +49,28 @@ class BookingViewSet(viewsets.ModelViewSet):
         except ValidationError as e:
             raise serializers.ValidationError(e.message if hasattr(e, 'message') else e.messages)
             
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def bulk_import(self, request):
+        """
+        Imports a batch of bookings: {"bookings": [...], "notify": false, "generate_invoices": false, "dry_run": false}.
+        Each row has unit, tenant, start_date, end_date and optional status / total_price.
+        """
+        if request.user.role not in ['landlord', 'admin']:
+            return Response({"detail": "Landlords only."}, status=403)
+
+        rows = request.data.get('bookings')
+        if not isinstance(rows, list):
+            return Response({"detail": "'bookings' must be a list."}, status=400)
+
+        report = import_bookings(
+            rows,
+            owner=None if request.user.role == 'admin' else request.user,
+            notify=request.data.get('notify') in (True, '1', 'true'),
+            generate_invoices=request.data.get('generate_invoices') in (True, '1', 'true'),
+            dry_run=request.data.get('dry_run') in (True, '1', 'true'),
+        )
+        return Response(report, status=201 if report['created'] else 200)
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_properties_bookings(self, request):
         if not request.user.role == 'landlord':
@@ -51,19 +82,14 @@ class BookingViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def monthly_revenue(self, request):
+        """
+        Paid revenue per month, read from the revenue rollup.
+        ?verify=1 also compares it against the live aggregate over bookings and invoices.
+        """
         if not request.user.role == 'landlord':
             return Response({"detail": "Landlords only."}, status=403)
 
-        revenue_data = Booking.objects.filter(
-            unit__property__owner=request.user,
-            status__in=['confirmed', 'completed'],
-            invoice__status='paid'
-        ).annotate(
-            year=ExtractYear('start_date'),
-            month=ExtractMonth('start_date')
-        ).values('year', 'month').order_by('year', 'month').annotate(
-            total_revenue=Sum('invoice__amount')
-        )
+        revenue_data = rollup_monthly_revenue(request.user)
 
         # Format data for frontend (e.g., labels for months, values for revenue)
         formatted_data = []
@@ -76,9 +102,32 @@ class BookingViewSet(viewsets.ModelViewSet):
                 'label': f"{month_name} {entry['year']}",
                 'revenue': entry['total_revenue']
             })
-        
+
+        if request.query_params.get('verify') in ('1', 'true'):
+            mismatches = verify_revenue_rollup(request.user)
+            return Response({'results': formatted_data, 'verified': not mismatches, 'mismatches': mismatches})
+
         return Response(formatted_data)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def analytics(self, request):
+        """
+        Occupancy rate, ADR and RevPAR per unit, property and month.
+        ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD (end exclusive, at most 731 days).
+        """
+        if not request.user.role == 'landlord':
+            return Response({"detail": "Landlords only."}, status=403)
+
+        try:
+            start_date = datetime.strptime(request.query_params.get('start_date', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.query_params.get('end_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"error": "start_date and end_date are required (YYYY-MM-DD)"}, status=400)
+        if not 0 < (end_date - start_date).days <= MAX_WINDOW_DAYS:
+            return Response({"error": f"end_date must be after start_date and within {MAX_WINDOW_DAYS} days"}, status=400)
+
+        return Response(occupancy_analytics(request.user, start_date, end_date))
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def confirm(self, request, pk=None):
         booking = self.get_object()
@@ -107,24 +156,10 @@ class BookingViewSet(viewsets.ModelViewSet):
         if not request.user.role == 'landlord':
             return Response({"detail": "Forbidden"}, status=403)
 
-        bookings = Booking.objects.filter(unit__property__owner=request.user).select_related('unit__property', 'tenant', 'invoice')
-
-        pseudo_buffer = Echo()
-        writer = csv.writer(pseudo_buffer)
-
-        def row_generator():
-            yield writer.writerow(['Property', 'Unit', 'Tenant', 'Start Date', 'End Date', 'Status', 'Amount'])
-            for b in bookings:
-                yield writer.writerow([
-                    b.unit.property.title,
-                    b.unit.unit_number,
-                    b.tenant.username,
-                    str(b.start_date),
-                    str(b.end_date),
-                    b.status,
-                    str(b.total_price or 0.00)
-                ])
-
-        response = StreamingHttpResponse(row_generator(), content_type="text/csv")
+        # values_list + iterator: no model instances and no queryset result cache
+        rows = Booking.objects.filter(unit__property__owner=request.user).order_by('pk').values_list(
+            *(field for _, field in EXPORTS['bookings'][2])
+        ).iterator(chunk_size=CHUNK_SIZE)
+        response = StreamingHttpResponse(stream_csv(export_headers('bookings'), rows), content_type="text/csv")
         response['Content-Disposition'] = 'attachment; filename="bookings_report.csv"'
         return response
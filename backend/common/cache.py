@@ -0,0 +1,89 @@
+"""
+Response cache for anonymous reads of the public listings.
+
+Entries are keyed by the view, the request's normalized query string and the current
+version of every scope the response depends on: 'listings' for lists, 'availability' for
+date-filtered searches, and '<model>:<pk>' for single objects. Signals bump the versions of
+exactly the scopes a save or delete touches, which orphans the old entries. A bump also
+happens again after commit, in case another process re-cached pre-commit data.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+KEY_PREFIX = 'public'
+STATS_KEYS = {'hits': f'{KEY_PREFIX}:stats:hits', 'misses': f'{KEY_PREFIX}:stats:misses'}
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:version:{scope}'
+
+
+def scope_versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, timeout=None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
+
+def invalidate_public(*scopes):
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def response_key(view_name, scopes, request):
+    params = sorted((name, value) for name in request.query_params for value in request.query_params.getlist(name))
+    versions = ':'.join(f'{scope}={version}' for scope, version in zip(scopes, scope_versions(scopes)))
+    query = hashlib.md5(f"{request.get_host()}?{urlencode(params)}".encode()).hexdigest()
+    return f'{KEY_PREFIX}:response:{view_name}:{versions}:{query}'
+
+
+def _count(outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def cached_response(key, render):
+    """The cached payload for key, else render()'s Response, whose data is cached if it is a 200."""
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+    _count('misses')
+    response = render()
+    if response.status_code == 200:
+        cache.set(key, response.data, timeout=settings.PUBLIC_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def public_cache_stats(reset=False):
+    values = cache.get_many(STATS_KEYS.values())
+    stats = {outcome: values.get(key, 0) for outcome, key in STATS_KEYS.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total, 4) if total else None
+    if reset:
+        cache.delete_many(STATS_KEYS.values())
+    return stats
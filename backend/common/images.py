@@ -0,0 +1,64 @@
+"""
+Resized, compressed derivatives of uploaded photos.
+
+Derivatives are WebP files stored under derivatives/ and named after the SHA-256 of the
+original, so re-uploads of the same photo (and re-runs of the task) reuse the files already
+generated. Each photo model keeps its hash and a {width: storage name} map in `derivatives`.
+"""
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .files import sha256_hexdigest
+
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+WEBP_QUALITY = 80
+DERIVED_FIELDS = {'content_hash', 'derivatives'}
+
+
+def derivative_name(digest, width):
+    return f'derivatives/{digest[:2]}/{digest}-{width}w.webp'
+
+
+def _render(image, width):
+    resized = image.copy()
+    resized.thumbnail((width, width * 10), Image.LANCZOS)
+    buffer = BytesIO()
+    resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_derivatives(photo):
+    """
+    Fills photo.content_hash and photo.derivatives and saves just those fields.
+    Widths at or above the original's are skipped, except the smallest, so nothing is upscaled
+    and even small photos get one compressed rendition.
+    """
+    digest = sha256_hexdigest(photo.image)
+    derivatives, image = {}, None
+    for width in DERIVATIVE_WIDTHS:
+        name = derivative_name(digest, width)
+        if default_storage.exists(name):
+            derivatives[str(width)] = name
+            continue
+        if image is None:
+            with photo.image.open('rb') as original:
+                image = ImageOps.exif_transpose(Image.open(original))
+                image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if width >= image.width and derivatives:
+            break
+        derivatives[str(width)] = default_storage.save(name, _render(image, width))
+    photo.content_hash, photo.derivatives = digest, derivatives
+    photo.save(update_fields=sorted(DERIVED_FIELDS))
+    return derivatives
+
+
+def srcset(derivatives, request=None):
+    """'<url> 320w, <url> 640w, ...' for the stored derivatives, smallest first."""
+    entries = []
+    for width, name in sorted(derivatives.items(), key=lambda item: int(item[0])):
+        url = default_storage.url(name)
+        entries.append(f"{request.build_absolute_uri(url) if request else url} {width}w")
+    return ', '.join(entries)
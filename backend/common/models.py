@@ -0,0 +1,42 @@
+class ChangeTrackingMixin:
+    """
+    Remembers the values of `tracked_fields` as they were loaded from the database,
+    so save logic and signals can tell what changed without re-fetching the row.
+    The snapshot is refreshed after every save and refresh_from_db().
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self):
+        # Deferred fields are not in __dict__ and are simply left out of the snapshot
+        self._loaded_values = {
+            name: self.__dict__[self._meta.get_field(name).attname]
+            for name in self.tracked_fields
+            if self._meta.get_field(name).attname in self.__dict__
+        }
+
+    def previous(self, field_name):
+        """The value the field had when loaded, or None for rows not loaded from the database."""
+        return getattr(self, '_loaded_values', {}).get(field_name)
+
+    def has_changed(self, field_name):
+        loaded = getattr(self, '_loaded_values', {})
+        if self._state.adding or field_name not in loaded:
+            return True
+        return loaded[field_name] != getattr(self, self._meta.get_field(field_name).attname)
+
+    def changed_fields(self):
+        return [name for name in self.tracked_fields if self.has_changed(name)]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_tracked_fields()
@@ -0,0 +1,52 @@
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination on (created_at, id): no COUNT(*) and no OFFSET scan, however deep the page."""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CursorOrPageNumberPagination(BasePagination):
+    """
+    Cursor pagination by default; clients that still need page numbers (and a total
+    count) keep getting PageNumberPagination by passing ?page=.
+    """
+    cursor_class = CreatedAtCursorPagination
+    page_number_class = PageNumberPagination
+
+    def _select(self, request):
+        paginator_class = self.page_number_class if self.page_number_class.page_query_param in request.query_params else self.cursor_class
+        self.paginator = paginator_class()
+        return self.paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        paginator = self._select(request)
+        if not isinstance(paginator, self.cursor_class) and not queryset.ordered:
+            queryset = queryset.order_by(*self.cursor_class.ordering)
+        return paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.cursor_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = self.cursor_class().get_schema_operation_parameters(view)
+        names = {parameter['name'] for parameter in parameters}
+        return parameters + [
+            parameter for parameter in self.page_number_class().get_schema_operation_parameters(view)
+            if parameter['name'] not in names
+        ]
+
+    @property
+    def display_page_controls(self):
+        return getattr(getattr(self, 'paginator', None), 'display_page_controls', False)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return data['results']
@@ -0,0 +1,59 @@
+from rest_framework import permissions, serializers
+from rest_framework.serializers import ListSerializer
+
+from .images import srcset
+
+
+def _field_list(value):
+    return None if value is None else {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request):
+    """
+    The ?fields= and ?expand= query parameters as sets of names (None when absent).
+    Only reads are shaped; writes always see the full serializer.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None, None
+    return _field_list(request.query_params.get('fields')), _field_list(request.query_params.get('expand'))
+
+
+def field_wanted(request, name, expandable=True):
+    fields, expand = requested_fields(request)
+    if fields is not None and name not in fields:
+        return False
+    if expandable and expand is not None and name not in expand:
+        # Naming a nested field in fields= expands it as well
+        return fields is not None
+    return True
+
+
+class SparseFieldsetMixin:
+    """
+    Lets a read request shape the top-level serializer:
+    ?fields=id,status keeps only those fields, and ?expand=unit_details keeps only the
+    listed `expandable_fields` (nested objects); a bare ?expand= gives the flat summary.
+    Without either parameter the full representation is returned.
+    """
+    expandable_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not (self.parent is None or isinstance(self.parent, ListSerializer) and self.parent.parent is None):
+            return fields
+        request = self.context.get('request')
+        for name in list(fields):
+            if not field_wanted(request, name, expandable=name in self.expandable_fields):
+                del fields[name]
+        return fields
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """A photo's resized derivatives as an <img srcset> string; empty until they are generated."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'derivatives')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return srcset(value or {}, self.context.get('request'))
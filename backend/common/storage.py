@@ -0,0 +1,77 @@
+"""
+Content-addressed file storage for the document vault.
+
+Every file is stored once under vault/<aa>/<sha256><ext>. The hash is computed while the
+upload is streamed to a temporary file in the vault; if a blob with that hash already exists
+the temporary file is dropped and the existing name is returned, otherwise it is renamed
+into place. Rows that reference the same blob share one file; gc_vault removes blobs that no
+row references any more.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+VAULT_DIR = 'vault'
+BLOB_NAME_RE = re.compile(r'^vault/[0-9a-f]{2}/([0-9a-f]{64})(\.\w+)?$')
+
+
+def blob_hash(name):
+    """The SHA-256 a vault blob is named after, or None for names outside the vault."""
+    match = BLOB_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.\w{1,10}', extension):
+            extension = ''
+        vault = self.path(VAULT_DIR)
+        os.makedirs(vault, exist_ok=True)
+
+        digest = hashlib.sha256()
+        # Dot-prefixed so gc_vault never mistakes an upload in progress for a blob
+        with tempfile.NamedTemporaryFile(dir=vault, prefix='.upload-', delete=False) as tmp:
+            try:
+                for chunk in content.chunks():
+                    chunk = chunk.encode() if isinstance(chunk, str) else chunk
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+
+        sha256 = digest.hexdigest()
+        blob = f'{VAULT_DIR}/{sha256[:2]}/{sha256}{extension}'
+        path = self.path(blob)
+        if os.path.exists(path):
+            os.unlink(tmp.name)
+            # Refresh the mtime so gc_vault's grace period covers the row about to reference it
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp.name, self.file_permissions_mode)
+            os.replace(tmp.name, path)
+        return blob
+
+    def blobs(self):
+        """Storage names of every blob in the vault."""
+        if not self.exists(VAULT_DIR):
+            return
+        for prefix in self.listdir(VAULT_DIR)[0]:
+            for filename in self.listdir(f'{VAULT_DIR}/{prefix}')[1]:
+                name = f'{VAULT_DIR}/{prefix}/{filename}'
+                if blob_hash(name):
+                    yield name
+
+
+vault_storage = ContentAddressedStorage()
@@ -0,0 +1,122 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .cache import cached_response, response_key
+from .serializers import field_wanted
+
+
+class SparseFieldsetViewMixin:
+    """
+    Loads only the relations the requested fields need (see SparseFieldsetMixin).
+    `field_select_related` / `field_prefetch_related` map a serializer field name to the
+    lookups that field renders from.
+    """
+    field_select_related = {}
+    field_prefetch_related = {}
+
+    def with_requested_relations(self, queryset):
+        serializer_class = self.get_serializer_class()
+        expandable = getattr(serializer_class, 'expandable_fields', ())
+
+        def lookups(mapping):
+            return [
+                lookup
+                for name, names in mapping.items()
+                if field_wanted(self.request, name, expandable=name in expandable)
+                for lookup in names
+            ]
+
+        select, prefetch = lookups(self.field_select_related), lookups(self.field_prefetch_related)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class PublicCacheMixin:
+    """
+    Serves anonymous list and retrieve responses from the public response cache (see
+    common.cache). Lists depend on the 'listings' scope, a retrieve on '<public_cache_name>:<pk>'.
+    """
+    public_cache_name = None
+
+    def public_cached(self, request, scopes, render):
+        if request.user.is_authenticated:
+            return render()
+        return cached_response(response_key(f'{self.public_cache_name}:{self.action}', scopes, request), render)
+
+    def list(self, request, *args, **kwargs):
+        return self.public_cached(
+            request, ['listings'], lambda: super(PublicCacheMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        def render():
+            return super(PublicCacheMixin, self).retrieve(request, *args, **kwargs)
+
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')
+        if not pk.isdigit() or str(int(pk)) != pk:
+            # Only canonical ids, so every cached copy is reached by the object's version bump
+            return render()
+        return self.public_cached(request, [f'{self.public_cache_name}:{pk}'], render)
+
+
+class ConditionalGetMixin:
+    """
+    ETag on list and retrieve, plus Last-Modified on retrieve. The validators come from a single aggregate
+    over the filtered queryset: max(`conditional_updated_field`) and the row count, plus the
+    max of `conditional_related_fields` for nested data. Because they are computed before
+    serialization, an unchanged resource costs one query and returns 304.
+    """
+    conditional_updated_field = 'updated_at'
+    conditional_related_fields = ()
+
+    def conditional_validators(self, queryset, instance=None):
+        fields = (self.conditional_updated_field, *self.conditional_related_fields)
+        if instance is not None and not self.conditional_related_fields:
+            count, stamps = 1, [getattr(instance, self.conditional_updated_field)]
+        else:
+            values = queryset.order_by().aggregate(
+                # Related fields join to-many relations, so rows have to be counted distinctly
+                count=Count('pk', distinct=bool(self.conditional_related_fields)),
+                **{f'last_{i}': Max(field) for i, field in enumerate(fields)}
+            )
+            count, stamps = values['count'], [values[f'last_{i}'] for i in range(len(fields))]
+        stamps = [stamp for stamp in stamps if stamp]
+        last_modified = max(stamps) if stamps else None
+        # The same data renders differently per user and per query (page, fields, ...)
+        state = f"{self.request.user.pk}:{self.request.get_full_path()}:{count}:{[str(stamp) for stamp in stamps]}"
+        return quote_etag(hashlib.md5(state.encode()).hexdigest()), last_modified
+
+    def _conditional(self, request, queryset, render, instance=None):
+        etag, last_modified = self.conditional_validators(queryset, instance)
+        # Lists only get the ETag: a max() timestamp cannot see rows that were deleted,
+        # so If-Modified-Since alone would answer 304 for a list that lost a row
+        timestamp = int(last_modified.timestamp()) if last_modified and instance is not None else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            response.setdefault('Cache-Control', 'private, no-cache')
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(
+            request, self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self._conditional(
+            request, self.get_queryset().filter(pk=instance.pk),
+            lambda: Response(self.get_serializer(instance).data), instance
+        )
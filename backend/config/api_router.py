@@ -1,22 +1,26 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from users.views import UserViewSet
-from properties.views import PropertyViewSet, UnitViewSet
+from properties.views import PropertyViewSet, UnitViewSet, DocumentViewSet
 from bookings.views import BookingViewSet
-from billing.views import InvoiceViewSet
+from billing.views import InvoiceViewSet, TransactionViewSet, ExportView
 from maintenance.views import MaintenanceRequestViewSet
 from properties.views import GlobalSearchView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
+# Registered before properties so 'documents' is not taken for a property pk
+router.register(r'properties/documents', DocumentViewSet, basename='document')
 router.register(r'properties', PropertyViewSet, basename='property')
 router.register(r'units', UnitViewSet, basename='unit')
 router.register(r'bookings', BookingViewSet, basename='booking')
 router.register(r'billing/invoices', InvoiceViewSet, basename='invoice')
+router.register(r'billing/transactions', TransactionViewSet, basename='transaction')
 router.register(r'maintenance/requests', MaintenanceRequestViewSet, basename='maintenance-request')
 
 app_name = 'api_v1'
 urlpatterns = [
     path('search/', GlobalSearchView.as_view(), name='global-search'),
+    path('exports/<str:dataset>/', ExportView.as_view(), name='export'),
     path('', include(router.urls)),
 ]
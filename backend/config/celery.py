@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -18,3 +19,10 @@ app.autodiscover_tasks()
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+@worker_process_init.connect
+def warm_pdf_renderer(**kwargs):
+    # PDF worker processes parse the invoice stylesheet and load fonts before their first task
+    if os.environ.get('PDF_WORKER'):
+        from billing.pdf import warm_up
+        warm_up()
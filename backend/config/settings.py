@@ -4,6 +4,7 @@ Django settings for config project.
 
 import os
 from pathlib import Path
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
     'billing',
     'maintenance',
     'notifications',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -104,6 +106,32 @@ else:
     }
 
 
+# Cache: Redis when configured so invalidations reach every process, else per-process memory
+if os.environ.get('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL'),
+        }
+    }
+
+# Seconds anonymous listing responses stay cached; saves invalidate them sooner (common.cache)
+PUBLIC_CACHE_TIMEOUT = int(os.environ.get('PUBLIC_CACHE_TIMEOUT', 300))
+
+# Booking concurrency engine: 'lock' (row lock on the unit, any database) or
+# 'exclusion' (PostgreSQL exclusion constraint, no lock). Falls back to 'lock' off PostgreSQL.
+BOOKING_ENGINE = os.environ.get('BOOKING_ENGINE', 'lock')
+
+# Exports with more rows than this are generated by Celery into the document vault
+EXPORT_SYNC_MAX_ROWS = int(os.environ.get('EXPORT_SYNC_MAX_ROWS', 5000))
+
+# Vault downloads are handed to the front proxy: 'X-Accel-Redirect' (nginx) or 'X-Sendfile'.
+# Set it only where every API request goes through that proxy; when unset, files are streamed
+# by Django. nginx serves SENDFILE_URL_PREFIX from MEDIA_ROOT internally.
+SENDFILE_BACKEND = os.environ.get('SENDFILE_BACKEND', '')
+SENDFILE_URL_PREFIX = '/protected-media/'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -192,9 +220,41 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_CREDENTIALS = True
 
+# Email: SMTP, pointed at the Mailpit container in docker-compose
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = int(os.environ.get('EMAIL_USE_TLS', 0))
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'PropManage <no-reply@propmanage.local>')
+
 # Celery Config
 CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
+# Invoice PDFs go to their own queue, consumed by the celery_pdf_worker service, so
+# month-end rendering never delays email and other tasks
+CELERY_TASK_ROUTES = {
+    'billing.tasks.generate_invoice_pdf_task': {'queue': 'pdf'},
+    'billing.tasks.render_invoice_pdfs_task': {'queue': 'pdf'},
+}
+PDF_BATCH_SIZE = int(os.environ.get('PDF_BATCH_SIZE', 50))
+CELERY_BEAT_SCHEDULE = {
+    # Also retries backed-off messages once they are due
+    'deliver-pending-emails': {
+        'task': 'notifications.tasks.deliver_pending_emails_task',
+        'schedule': crontab(),
+    },
+    'complete-finished-bookings': {
+        'task': 'bookings.tasks.complete_finished_bookings_task',
+        'schedule': crontab(minute=15),
+    },
+    'mark-overdue-invoices': {
+        'task': 'billing.tasks.mark_overdue_invoices_task',
+        'schedule': crontab(minute=45),
+    },
+}
 
 CHANNEL_LAYERS = {
     "default": {
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0003_created_at_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancephoto',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='maintenancephoto',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
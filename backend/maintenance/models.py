@@ -1,8 +1,10 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django_fsm import FSMField, transition
+from common.models import ChangeTrackingMixin
 
-class MaintenanceRequest(models.Model):
+class MaintenanceRequest(ChangeTrackingMixin, models.Model):
     PRIORITY_CHOICES = (
         ('low', 'Low'),
         ('medium', 'Medium'),
@@ -23,6 +25,7 @@ class MaintenanceRequest(models.Model):
         ('structural', 'Structural'),
         ('other', 'Other'),
     )
+    tracked_fields = ('status', 'cost')
 
     tenant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='maintenance_requests')
     property = models.ForeignKey('properties.Property', on_delete=models.CASCADE, related_name='maintenance_requests')
@@ -43,6 +46,18 @@ class MaintenanceRequest(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, overall and per tenant
+            models.Index(fields=['-created_at', '-id'], name='maintenance_created_idx'),
+            models.Index(fields=['tenant', '-created_at', '-id'], name='maintenance_tenant_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.status == 'resolved' and self.has_changed('status'):
+            self.resolved_at = timezone.now()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Ticket #{self.id} - {self.title} ({self.status})"
 
@@ -66,3 +81,6 @@ class MaintenancePhoto(models.Model):
     request = models.ForeignKey(MaintenanceRequest, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='maintenance/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Filled in by generate_maintenance_photo_derivatives_task; see common.images
+    content_hash = models.CharField(max_length=64, blank=True)
+    derivatives = models.JSONField(default=dict, blank=True)
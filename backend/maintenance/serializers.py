@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from .models import MaintenanceRequest, MaintenancePhoto
+from common.serializers import SrcsetField
 
 class MaintenancePhotoSerializer(serializers.ModelSerializer):
+    srcset = SrcsetField()
+
     class Meta:
         model = MaintenancePhoto
-        fields = ('id', 'image', 'uploaded_at')
+        fields = ('id', 'image', 'srcset', 'uploaded_at')
 
 class MaintenanceRequestSerializer(serializers.ModelSerializer):
     photos = MaintenancePhotoSerializer(many=True, read_only=True)
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from common.images import DERIVED_FIELDS
+from .models import MaintenancePhoto, MaintenanceRequest
+from .tasks import generate_maintenance_photo_derivatives_task
+
+@receiver(post_save, sender=MaintenancePhoto)
+def maintenance_photo_post_save(sender, instance, update_fields=None, **kwargs):
+    # The task's own save only writes the derived fields
+    if update_fields and set(update_fields) <= DERIVED_FIELDS:
+        return
+    photo_id = instance.pk
+    transaction.on_commit(lambda: generate_maintenance_photo_derivatives_task.delay(photo_id))
+
+@receiver(post_save, sender=MaintenancePhoto)
+@receiver(post_delete, sender=MaintenancePhoto)
+def maintenance_photo_changed(sender, instance, **kwargs):
+    # Photos are rendered inside their request: keep its updated_at (its ETag) current
+    MaintenanceRequest.objects.filter(pk=instance.request_id).update(updated_at=timezone.now())
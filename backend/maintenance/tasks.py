@@ -0,0 +1,11 @@
+from celery import shared_task
+
+@shared_task
+def generate_maintenance_photo_derivatives_task(photo_id):
+    from common.images import generate_derivatives
+    from .models import MaintenancePhoto
+
+    photo = MaintenancePhoto.objects.filter(pk=photo_id).first()
+    if photo is None:
+        return None
+    return generate_derivatives(photo)
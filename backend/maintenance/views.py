@@ -5,10 +5,13 @@ from .models import MaintenanceRequest
 from .serializers import MaintenanceRequestSerializer
 from django.db.models import Q
 from notifications.utils import send_notification
+from common.pagination import CursorOrPageNumberPagination
+from common.views import ConditionalGetMixin
 
-class MaintenanceRequestViewSet(viewsets.ModelViewSet):
+class MaintenanceRequestViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MaintenanceRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CursorOrPageNumberPagination
 
     def get_queryset(self):
         user = self.request.user
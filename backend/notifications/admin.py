@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import OutgoingEmail
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('message_type', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'message_type')
+    search_fields = ('to',)
@@ -0,0 +1,135 @@
+"""
+Transactional email through the OutgoingEmail outbox.
+
+Messages are queued in the caller's transaction and delivered in batches: each batch opens
+one SMTP connection, loads each message type's templates once, and backs failed messages
+off exponentially until MAX_ATTEMPTS.
+"""
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+# message type -> template prefix; each type has <prefix>_subject.txt, <prefix>.txt and <prefix>.html
+MESSAGE_TYPES = {
+    'booking_confirmation': 'emails/booking_confirmation',
+}
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 6
+BACKOFF = timedelta(minutes=1)  # 1, 2, 4, 8, 16 minutes between attempts
+# How long a worker holds claimed rows before another may retry them
+LEASE = timedelta(minutes=10)
+
+
+def queue_email(message_type, to, context):
+    return OutgoingEmail.objects.create(message_type=message_type, to=to, context=context)
+
+
+def queue_booking_confirmations(booking_ids):
+    """Queues one confirmation per booking whose tenant has an email address; returns the rows."""
+    from bookings.models import Booking
+
+    rows = Booking.objects.filter(pk__in=booking_ids).exclude(tenant__email='').values_list(
+        'pk', 'tenant__email', 'tenant__first_name', 'tenant__username',
+        'unit__title', 'unit__unit_number', 'unit__property__title', 'unit__property__address',
+        'start_date', 'end_date', 'total_price', 'status'
+    )
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(message_type='booking_confirmation', to=email, context={
+            'booking_id': pk,
+            'name': first_name or username,
+            'unit': f"{unit_title} ({unit_number})",
+            'property': property_title,
+            'address': address,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'total_price': str(total_price) if total_price is not None else None,
+            # Sent on creation, when most bookings are still pending
+            'confirmed': status == 'confirmed',
+        })
+        for pk, email, first_name, username, unit_title, unit_number, property_title, address, start_date, end_date, total_price, status in rows
+    ])
+
+
+def _load_templates(message_type):
+    prefix = MESSAGE_TYPES[message_type]
+    return get_template(f'{prefix}_subject.txt'), get_template(f'{prefix}.txt'), get_template(f'{prefix}.html')
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutgoingEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at').select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutgoingEmail.objects.filter(pk__in=ids).update(next_attempt_at=now + LEASE)
+    return list(OutgoingEmail.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _record_failures(failures):
+    now = timezone.now()
+    for email, error in failures:
+        email.attempts += 1
+        email.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = 'failed'
+        else:
+            email.next_attempt_at = now + BACKOFF * 2 ** (email.attempts - 1)
+    OutgoingEmail.objects.bulk_update(
+        [email for email, _ in failures], ['attempts', 'last_error', 'status', 'next_attempt_at']
+    )
+
+
+def _send_batch(emails):
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # Server unreachable: the whole batch backs off together
+        _record_failures([(email, e) for email in emails])
+        return 0
+
+    templates, sent, failures = {}, [], []
+    try:
+        for email in emails:
+            try:
+                if email.message_type not in templates:
+                    templates[email.message_type] = _load_templates(email.message_type)
+                subject, text, html = templates[email.message_type]
+                message = EmailMultiAlternatives(
+                    subject=' '.join(subject.render(email.context).split()),
+                    body=text.render(email.context),
+                    to=[email.to],
+                    connection=connection,
+                )
+                message.attach_alternative(html.render(email.context), 'text/html')
+                message.send()
+                sent.append(email)
+            except Exception as e:
+                failures.append((email, e))
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    for email in sent:
+        email.status, email.sent_at, email.attempts, email.last_error = 'sent', now, email.attempts + 1, ''
+    OutgoingEmail.objects.bulk_update(sent, ['status', 'sent_at', 'attempts', 'last_error'])
+    _record_failures(failures)
+    return len(sent)
+
+
+def deliver_pending_emails(batch_size=BATCH_SIZE):
+    """Sends every due outbox message, one SMTP connection per batch. Returns the number sent."""
+    sent = 0
+    while True:
+        emails = _claim(batch_size)
+        if emails:
+            sent += _send_batch(emails)
+        if len(emails) < batch_size:
+            return sent
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from notifications.emails import BATCH_SIZE, deliver_pending_emails
+from notifications.models import OutgoingEmail
+
+class Command(BaseCommand):
+    help = 'Delivers due messages from the email outbox (e.g. against a local Mailpit)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Messages per SMTP connection')
+
+    def handle(self, *args, **options):
+        sent = deliver_pending_emails(batch_size=options['batch_size'])
+        pending = OutgoingEmail.objects.filter(status='pending').count()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {pending} still pending."))
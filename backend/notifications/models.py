@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmail(models.Model):
+    """
+    Outbox for transactional email. Rows are written in the same transaction as the change
+    they announce and delivered in batches by notifications.emails.deliver_pending_emails.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    message_type = models.CharField(max_length=50)
+    to = models.EmailField()
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Earliest time of the next attempt; pushed forward while a worker holds the row and on backoff
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'), name='email_pending_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.message_type} to {self.to} ({self.status})"
@@ -0,0 +1,6 @@
+from celery import shared_task
+
+@shared_task
+def deliver_pending_emails_task():
+    from .emails import deliver_pending_emails
+    return deliver_pending_emails()
@@ -1,7 +1,7 @@
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
-def send_notification(user_id, message, msg_type='info'):
+def send_notification(user_id, message, msg_type='info', **data):
     channel_layer = get_channel_layer()
     group_name = f"user_{user_id}"
     
@@ -12,7 +12,8 @@ def send_notification(user_id, message, msg_type='info'):
                 'type': 'send_notification',
                 'message': {
                     'message': message,
-                    'type': msg_type
+                    'type': msg_type,
+                    **data
                 }
             }
         )
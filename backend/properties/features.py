@@ -0,0 +1,106 @@
+"""
+Amenity filters and facets over Unit.features.
+
+Two kinds of feature are filterable: amenity flags ({"pool": true}) and numbers
+({"bedrooms": 2}); other values are display-only. On PostgreSQL filters run against the
+features column itself, served by its jsonb_path_ops GIN index. Elsewhere they run against
+UnitFeature, a one-row-per-feature side table rebuilt whenever a unit is saved. Facets always
+come from UnitFeature.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.fields.json import KeyTransform
+
+from .models import UnitFeature
+
+KEY_RE = re.compile(r'^\w{1,100}$')
+# ?bedrooms>=2 arrives as the parameter "bedrooms>" with value "2"; ?bedrooms>2 as "bedrooms>2" with no value
+RANGE_PARAM_RE = re.compile(r'^(\w{1,100})(>=|<=|>|<)(-?\d+(?:\.\d+)?)?$')
+RANGE_LOOKUPS = {'>=': 'gte', '<=': 'lte', '>': 'gt', '<': 'lt'}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def feature_rows(unit):
+    return [
+        UnitFeature(unit=unit, key=key, value=None if value is True else value)
+        for key, value in (unit.features or {}).items()
+        if KEY_RE.match(key) and (value is True or _is_number(value))
+    ]
+
+
+def sync_unit_features(unit):
+    UnitFeature.objects.filter(unit=unit).delete()
+    UnitFeature.objects.bulk_create(feature_rows(unit))
+
+
+def parse_feature_filters(query_params):
+    """
+    ({flag, ...}, [(key, lookup, number), ...]) from ?features=pool,parking and
+    bedrooms>=2 style parameters. Raises ValueError on malformed names or numbers.
+    """
+    flags = {flag.strip() for flag in query_params.get('features', '').split(',') if flag.strip()}
+    if any(not KEY_RE.match(flag) for flag in flags):
+        raise ValueError("Invalid feature name")
+
+    ranges = []
+    for param, value in query_params.items():
+        match = RANGE_PARAM_RE.match(param)
+        if not match:
+            continue
+        key, operator, inline = match.groups()
+        if inline is not None:
+            number = inline
+        elif value and operator in ('>', '<'):
+            # The '=' of >= / <= was taken as the parameter separator
+            number, operator = value, operator + '='
+        else:
+            raise ValueError(f"Invalid range for '{key}'")
+        ranges.append((key, RANGE_LOOKUPS[operator], float(number)))
+    return flags, ranges
+
+
+def filter_by_features(queryset, flags, ranges):
+    if connection.vendor == 'postgresql':
+        if flags:
+            # One containment test the GIN index answers for all flags together
+            queryset = queryset.filter(features__contains={flag: True for flag in flags})
+        for i, (key, lookup, number) in enumerate(ranges):
+            # An explicit key transform, so feature names never clash with lookup names
+            queryset = queryset.alias(**{f'feature_{i}': KeyTransform(key, 'features')}).filter(
+                **{f'feature_{i}__{lookup}': number}
+            )
+        return queryset
+
+    for flag in flags:
+        queryset = queryset.filter(Exists(
+            UnitFeature.objects.filter(unit=OuterRef('pk'), key=flag, value__isnull=True)
+        ))
+    for key, lookup, number in ranges:
+        queryset = queryset.filter(Exists(
+            UnitFeature.objects.filter(unit=OuterRef('pk'), key=key, **{f'value__{lookup}': number})
+        ))
+    return queryset
+
+
+def feature_facets(queryset):
+    """Unit counts per amenity flag and per value of each numeric feature, over the filtered units."""
+    rows = (
+        UnitFeature.objects.filter(unit__in=queryset.order_by().values('pk'))
+        .values_list('key', 'value').order_by().annotate(units=Count('unit'))
+    )
+    amenities, numeric = {}, {}
+    for key, value, units in rows:
+        if value is None:
+            amenities[key] = units
+        else:
+            label = str(int(value)) if value.is_integer() else str(value)
+            numeric.setdefault(key, {})[label] = units
+    return {
+        'amenities': dict(sorted(amenities.items())),
+        'numeric': {key: dict(sorted(values.items(), key=lambda item: float(item[0]))) for key, values in sorted(numeric.items())},
+    }
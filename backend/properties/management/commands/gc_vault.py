@@ -0,0 +1,29 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from common.storage import vault_storage
+from properties.models import Document
+
+class Command(BaseCommand):
+    help = 'Deletes document vault blobs that no document references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Keep unreferenced blobs written or reused this recently (uploads still being saved)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        referenced = set(Document.objects.filter(file__startswith='vault/').values_list('file', flat=True))
+        deleted = freed = 0
+        for name in vault_storage.blobs():
+            if name in referenced or vault_storage.get_modified_time(name) > cutoff:
+                continue
+            freed += vault_storage.size(name)
+            deleted += 1
+            if not options['dry_run']:
+                vault_storage.delete(name)
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced blobs ({freed} bytes)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from common.images import generate_derivatives
+from maintenance.models import MaintenancePhoto
+from properties.models import PropertyImage
+
+class Command(BaseCommand):
+    help = 'Generates resized derivatives for property images and maintenance photos that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate for every photo, not only missing ones')
+
+    def handle(self, *args, **options):
+        count = 0
+        for model in (PropertyImage, MaintenancePhoto):
+            photos = model.objects.all() if options['all'] else model.objects.filter(content_hash='')
+            for photo in photos.iterator():
+                try:
+                    generate_derivatives(photo)
+                    count += 1
+                except (OSError, ValueError) as e:
+                    self.stderr.write(f"{model.__name__} {photo.pk}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Derivatives generated for {count} photos."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from common.cache import public_cache_stats
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counters of the anonymous listing response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reading them')
+
+    def handle(self, *args, **options):
+        stats = public_cache_stats(reset=options['reset'])
+        rate = 'n/a' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+        self.stdout.write(f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {rate}")
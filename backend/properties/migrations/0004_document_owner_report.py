@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('properties', '0003_remove_property_base_price_remove_property_features_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='category',
+            field=models.CharField(choices=[('lease', 'Lease Agreement'), ('id', 'Identification'), ('contract', 'Contract'), ('report', 'Report'), ('other', 'Other')], max_length=20),
+        ),
+    ]
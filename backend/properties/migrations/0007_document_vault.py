@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:15
+
+import common.storage
+from django.db import migrations, models
+import properties.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(max_length=255, storage=common.storage.ContentAddressedStorage(), upload_to=properties.models.document_upload_to),
+        ),
+    ]
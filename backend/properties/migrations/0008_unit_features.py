@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+def create_features_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS unit_features_gin_idx ON properties_unit USING gin (features jsonb_path_ops)"
+        )
+
+
+def drop_features_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS unit_features_gin_idx")
+
+
+def backfill_unit_features(apps, schema_editor):
+    # Mirrors properties.features.feature_rows
+    Unit = apps.get_model('properties', 'Unit')
+    UnitFeature = apps.get_model('properties', 'UnitFeature')
+    rows = []
+    for unit_id, features in Unit.objects.values_list('pk', 'features').iterator():
+        for key, value in (features or {}).items():
+            number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if re.match(r'^\w{1,100}$', key) and (value is True or number):
+                rows.append(UnitFeature(unit_id=unit_id, key=key, value=None if value is True else value))
+    UnitFeature.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_document_vault'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_rows', to='properties.unit')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value', 'unit'], name='unit_feature_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='unitfeature',
+            constraint=models.UniqueConstraint(fields=('unit', 'key'), name='unit_feature_unique_key'),
+        ),
+        migrations.RunPython(create_features_gin_index, drop_features_gin_index),
+        migrations.RunPython(backfill_unit_features, migrations.RunPython.noop),
+    ]
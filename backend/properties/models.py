@@ -1,5 +1,9 @@
+import os
 from django.db import models
 from django.conf import settings
+from common.files import sha256_hexdigest
+from common.models import ChangeTrackingMixin
+from common.storage import blob_hash, vault_storage
 
 class Property(models.Model):
     """Container for multiple units (e.g., an Apartment Building or a Resort)."""
@@ -16,8 +20,11 @@ class Property(models.Model):
     def __str__(self):
         return self.title
 
-class Unit(models.Model):
+class Unit(ChangeTrackingMixin, models.Model):
     """The actual bookable entity (e.g., Room 101, Apartment 4B)."""
+    # Bookings' blocked_until is only recomputed when the buffer actually changes
+    tracked_fields = ('turnover_buffer_hours',)
+
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='units')
     unit_number = models.CharField(max_length=50)
     title = models.CharField(max_length=255) # e.g. "Luxury Suite with Ocean View"
@@ -28,16 +35,42 @@ class Unit(models.Model):
     
     # Turnover buffer (hours) - Business Logic requirement
     turnover_buffer_hours = models.PositiveIntegerField(default=24)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.property.title} - {self.unit_number}"
 
+class UnitFeature(models.Model):
+    """
+    Unit.features flattened to one row per filterable feature (see properties.features):
+    value is None for amenity flags and the number for numeric features.
+    """
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='feature_rows')
+    key = models.CharField(max_length=100)
+    value = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['unit', 'key'], name='unit_feature_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['key', 'value', 'unit'], name='unit_feature_lookup_idx'),
+        ]
+
 class PropertyImage(models.Model):
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='images', null=True)
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images', null=True, blank=True)
     image = models.ImageField(upload_to='properties/')
     is_main = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Filled in by generate_property_image_derivatives_task; see common.images
+    content_hash = models.CharField(max_length=64, blank=True)
+    derivatives = models.JSONField(default=dict, blank=True)
+
+def document_upload_to(instance, filename):
+    # The vault renames the file after its content hash; keep the name it was uploaded with
+    instance.filename = os.path.basename(filename)
+    return f'vault/{instance.filename}'
 
 class Document(models.Model):
     """Secure vault for leases, IDs, etc."""
@@ -45,11 +78,36 @@ class Document(models.Model):
         ('lease', 'Lease Agreement'),
         ('id', 'Identification'),
         ('contract', 'Contract'),
+        ('report', 'Report'),
         ('other', 'Other'),
     )
+    # Set for documents that belong to a user rather than a property, e.g. generated exports
+    owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='documents', null=True, blank=True)
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='documents', null=True, blank=True)
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='documents', null=True, blank=True)
     title = models.CharField(max_length=255)
-    file = models.FileField(upload_to='documents/')
+    # Content-addressed: documents with identical files share one stored blob (see common.storage)
+    file = models.FileField(upload_to=document_upload_to, storage=vault_storage, max_length=255)
+    filename = models.CharField(max_length=255, blank=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Edits and regenerated files (e.g. invoice PDFs) change the API ETags through this
+    updated_at = models.DateTimeField(auto_now=True)
+    # SHA-256 of the file, the ETag of downloads
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            # Store the upload first: the vault hashes it while writing
+            self.file.save(self.file.name, self.file.file, save=False)
+        if self.file:
+            # Blobs are named after their hash; files stored before the vault are hashed once
+            self.content_hash = blob_hash(self.file.name) or self.content_hash or sha256_hexdigest(self.file)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'content_hash', 'filename'}
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
+        super().save(*args, **kwargs)
+
+    def download_name(self):
+        return self.filename or os.path.basename(self.file.name)
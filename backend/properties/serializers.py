@@ -1,16 +1,20 @@
 from rest_framework import serializers
 from .models import Property, PropertyImage, Unit, Document
 from users.serializers import UserSerializer
+from common.serializers import SparseFieldsetMixin, SrcsetField
 
 class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = '__all__'
+        read_only_fields = ('owner', 'filename', 'content_hash')
 
 class PropertyImageSerializer(serializers.ModelSerializer):
+    srcset = SrcsetField()
+
     class Meta:
         model = PropertyImage
-        fields = ('id', 'image', 'is_main')
+        fields = ('id', 'image', 'srcset', 'is_main')
 
 class UnitSerializer(serializers.ModelSerializer):
     images = PropertyImageSerializer(many=True, read_only=True)
@@ -20,7 +24,9 @@ class UnitSerializer(serializers.ModelSerializer):
         model = Unit
         fields = '__all__'
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ('owner_details', 'units', 'images')
+
     owner_details = UserSerializer(source='owner', read_only=True)
     units = UnitSerializer(many=True, read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
@@ -33,9 +39,8 @@ class PropertySerializer(serializers.ModelSerializer):
     class Meta:
         model = Property
         fields = (
-            'id', 'owner', 'owner_details', 'title', 'description', 
-            'address', 'features', 'base_price', 'is_active', 
-            'images', 'uploaded_images', 'created_at', 'updated_at'
+            'id', 'owner', 'owner_details', 'title', 'description',
+            'address', 'units', 'images', 'uploaded_images', 'created_at', 'updated_at'
         )
         read_only_fields = ('owner', 'created_at', 'updated_at')
 
@@ -0,0 +1,228 @@
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Property, Unit, UnitFeature
+
+UNIT_IMPORT_FIELDS = ('title', 'description', 'base_price', 'features', 'is_active', 'turnover_buffer_hours')
+REQUIRED_FOR_CREATE = ('property', 'unit_number', 'title', 'base_price')
+TRUE_VALUES, FALSE_VALUES = {'1', 'true', 'yes', 'y'}, {'0', 'false', 'no', 'n'}
+
+
+def _blank(value):
+    return value is None or value == ''
+
+
+def _parse_unit_row(row):
+    """Turns one raw unit row (strings from CSV or JSON values) into typed fields plus a list of errors."""
+    errors = []
+    parsed = {}
+
+    for field in ('id', 'property', 'turnover_buffer_hours'):
+        if not _blank(row.get(field)):
+            try:
+                parsed[field] = int(row[field])
+                if parsed[field] < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors.append(f"{field}: a non-negative integer is required.")
+
+    for field, max_length in (('unit_number', 50), ('title', 255)):
+        if not _blank(row.get(field)):
+            parsed[field] = str(row[field]).strip()
+            if len(parsed[field]) > max_length:
+                errors.append(f"{field}: at most {max_length} characters.")
+    if row.get('description') is not None:
+        parsed['description'] = str(row['description'])
+
+    if not _blank(row.get('base_price')):
+        try:
+            parsed['base_price'] = Decimal(str(row['base_price']))
+            if parsed['base_price'] < 0 or parsed['base_price'].as_tuple().exponent < -2:
+                raise InvalidOperation
+        except InvalidOperation:
+            errors.append("base_price: a non-negative amount with at most 2 decimals is required.")
+
+    if not _blank(row.get('features')):
+        features = row['features']
+        if isinstance(features, str):
+            try:
+                features = json.loads(features)
+            except ValueError:
+                features = None
+        if isinstance(features, dict):
+            parsed['features'] = features
+        else:
+            errors.append("features: a JSON object is required.")
+
+    if not _blank(row.get('is_active')):
+        value = row['is_active']
+        if isinstance(value, bool):
+            parsed['is_active'] = value
+        elif str(value).strip().lower() in TRUE_VALUES | FALSE_VALUES:
+            parsed['is_active'] = str(value).strip().lower() in TRUE_VALUES
+        else:
+            errors.append("is_active: expected true or false.")
+
+    return parsed, errors
+
+
+def upsert_units(rows, owner=None, dry_run=False, batch_size=1000):
+    """
+    Creates or updates a batch of units with bulk inserts and updates.
+    A row updates the unit given by `id`, else the unit with the same property and unit_number,
+    else creates one. Property ownership is checked once per property; if owner is given,
+    rows for other landlords' properties are rejected.
+    Rows that would not change their unit are left alone. A dry run reports the same counts
+    and errors without writing anything.
+    Returns {'dry_run', 'created': n, 'updated': n, 'unchanged': n, 'buffer_clashes': [booking ids],
+    'errors': [{'row': index, 'errors': [...]}]}.
+    """
+    parsed_rows = []
+    row_errors = {}
+    for index, row in enumerate(rows):
+        parsed, errors = _parse_unit_row(row) if isinstance(row, dict) else ({}, ["Expected an object."])
+        if errors:
+            row_errors[index] = errors
+        else:
+            parsed_rows.append((index, parsed))
+
+    # Everything the batch refers to, in three queries
+    unit_ids = {parsed['id'] for _, parsed in parsed_rows if 'id' in parsed}
+    by_id = {unit.pk: unit for unit in Unit.objects.filter(pk__in=unit_ids)}
+    property_ids = {parsed['property'] for _, parsed in parsed_rows if 'property' in parsed}
+    property_ids |= {unit.property_id for unit in by_id.values()}
+    owners = dict(Property.objects.filter(pk__in=property_ids).values_list('pk', 'owner_id'))
+    by_number = {
+        (unit.property_id, unit.unit_number): unit
+        for unit in Unit.objects.filter(property_id__in=owners)
+    }
+    by_number.update({(unit.property_id, unit.unit_number): unit for unit in by_id.values()})
+
+    now = timezone.now()
+    to_create, to_update, seen, unchanged = [], {}, set(), 0
+    for index, parsed in parsed_rows:
+        unit = by_id.get(parsed['id']) if 'id' in parsed else None
+        if 'id' in parsed and unit is None:
+            row_errors[index] = ["id: unit does not exist."]
+            continue
+        property_id = parsed.get('property', unit.property_id if unit else None)
+        if property_id not in owners:
+            row_errors[index] = ["property: does not exist." if property_id else "property: this field is required."]
+            continue
+        if owner is not None and owners[property_id] != owner.pk:
+            row_errors[index] = ["property: not your property."]
+            continue
+        if unit is not None and property_id != unit.property_id:
+            row_errors[index] = ["property: units cannot be moved to another property."]
+            continue
+        unit_number = parsed.get('unit_number', unit.unit_number if unit else None)
+        if unit is None:
+            unit = by_number.get((property_id, unit_number))
+        if (property_id, unit_number) in seen:
+            row_errors[index] = [f"unit_number: '{unit_number}' appears more than once for this property."]
+            continue
+        if unit is not None and unit.unit_number != unit_number and (property_id, unit_number) in by_number:
+            row_errors[index] = [f"unit_number: '{unit_number}' is already used in this property."]
+            continue
+
+        if unit is None:
+            missing = [field for field in REQUIRED_FOR_CREATE if field not in parsed]
+            if missing:
+                row_errors[index] = [f"{field}: this field is required." for field in missing]
+                continue
+            unit = Unit(property_id=property_id, description='', updated_at=now)
+            for field in ('unit_number', *UNIT_IMPORT_FIELDS):
+                if field in parsed:
+                    setattr(unit, field, parsed[field])
+            to_create.append(unit)
+        else:
+            changed = tuple(
+                field for field in ('unit_number', *UNIT_IMPORT_FIELDS)
+                if field in parsed and getattr(unit, field) != parsed[field]
+            )
+            for field in changed:
+                setattr(unit, field, parsed[field])
+            if changed:
+                unit.updated_at = now
+                to_update[unit.pk] = (unit, changed)
+            else:
+                unchanged += 1
+        seen.add((property_id, unit_number))
+
+    report = {
+        'dry_run': dry_run,
+        'created': len(to_create),
+        'updated': len(to_update),
+        'unchanged': unchanged,
+        'buffer_clashes': [],
+        'errors': [{'row': index, 'errors': errors} for index, errors in sorted(row_errors.items())],
+    }
+    if dry_run or not (to_create or to_update):
+        return report
+
+    with transaction.atomic():
+        created = Unit.objects.bulk_create(to_create, batch_size=batch_size)
+        _update_units(to_update.values(), batch_size)
+        report['buffer_clashes'] = _after_bulk_save(created, to_update.values(), batch_size=batch_size)
+    return report
+
+
+def _update_units(changes, batch_size):
+    """
+    One primary-key UPDATE per unit, sent with executemany per set of changed fields.
+    bulk_update's CASE WHEN statements grow with the batch and get slow on large imports.
+    """
+    groups = {}
+    for unit, changed in changes:
+        groups.setdefault(changed, []).append(unit)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for changed, units in groups.items():
+            fields = [Unit._meta.get_field(name) for name in (*changed, 'updated_at')]
+            sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+                quote(Unit._meta.db_table),
+                ', '.join(f'{quote(field.column)} = %s' for field in fields),
+                quote(Unit._meta.pk.column),
+            )
+            for start in range(0, len(units), batch_size):
+                cursor.executemany(sql, [
+                    [field.get_db_prep_save(getattr(unit, field.attname), connection) for field in fields] + [unit.pk]
+                    for unit in units[start:start + batch_size]
+                ])
+
+
+def _after_bulk_save(created, changes, batch_size):
+    """
+    Bulk writes skip save() and signals, so their side effects are replayed in bulk.
+    Returns the bookings whose blocked_until could not follow a raised turnover buffer.
+    """
+    from bookings.services import sync_blocked_until
+    from common.cache import invalidate_public
+    from search.autocomplete import PUBLIC_SCOPE, invalidate_autocomplete, owner_scope
+    from search.index import index_objects
+
+    from .features import feature_rows
+
+    updated = [unit for unit, _ in changes]
+    feature_changes = [unit for unit, changed in changes if 'features' in changed]
+    buffer_clashes = sync_blocked_until([unit for unit, changed in changes if 'turnover_buffer_hours' in changed])
+
+    UnitFeature.objects.filter(unit__in=[unit.pk for unit in feature_changes]).delete()
+    UnitFeature.objects.bulk_create(
+        [row for unit in created + feature_changes for row in feature_rows(unit)], batch_size=batch_size
+    )
+
+    units = created + updated
+    owners = index_objects('unit', [unit.pk for unit in units])
+    invalidate_autocomplete(PUBLIC_SCOPE, *(owner_scope(pk) for pk in owners))
+
+    property_ids = {unit.property_id for unit in units}
+    Property.objects.filter(pk__in=property_ids).update(updated_at=timezone.now())
+    invalidate_public(
+        'listings', 'availability',
+        *(f'property:{pk}' for pk in property_ids), *(f'unit:{unit.pk}' for unit in updated)
+    )
+    return buffer_clashes
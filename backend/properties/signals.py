@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from django.dispatch import receiver
+from common.cache import invalidate_public
+from common.images import DERIVED_FIELDS
+from .features import sync_unit_features
+from .models import Property, PropertyImage, Unit
+from .tasks import generate_property_image_derivatives_task
+
+@receiver(post_save, sender=PropertyImage)
+def property_image_post_save(sender, instance, update_fields=None, **kwargs):
+    # The task's own save only writes the derived fields
+    if update_fields and set(update_fields) <= DERIVED_FIELDS:
+        return
+    image_id = instance.pk
+    transaction.on_commit(lambda: generate_property_image_derivatives_task.delay(image_id))
+
+@receiver(post_save, sender=Unit)
+def unit_features_post_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'features' in update_fields:
+        sync_unit_features(instance)
+
+# Public response cache (common.cache): each change bumps only the scopes it shows up in
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def property_changed(sender, instance, **kwargs):
+    # Units render their property's title
+    unit_scopes = [f'unit:{pk}' for pk in Unit.objects.filter(property_id=instance.pk).values_list('pk', flat=True)]
+    invalidate_public('listings', 'availability', f'property:{instance.pk}', *unit_scopes)
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def unit_changed(sender, instance, **kwargs):
+    invalidate_public('listings', 'availability', f'unit:{instance.pk}', f'property:{instance.property_id}')
+    # Properties render their units: keep the property's updated_at (its ETag) current
+    Property.objects.filter(pk=instance.property_id).update(updated_at=timezone.now())
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def property_image_changed(sender, instance, **kwargs):
+    scopes = ['listings', 'availability']
+    if instance.unit_id:
+        scopes.append(f'unit:{instance.unit_id}')
+    property_id = instance.property_id or Unit.objects.filter(pk=instance.unit_id).values_list('property_id', flat=True).first()
+    if property_id:
+        scopes.append(f'property:{property_id}')
+    invalidate_public(*scopes)
+    # Images are rendered inside their unit and property, so they count as changes to both
+    now = timezone.now()
+    Unit.objects.filter(pk=instance.unit_id).update(updated_at=now)
+    Property.objects.filter(pk=property_id).update(updated_at=now)
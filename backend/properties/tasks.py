@@ -0,0 +1,11 @@
+from celery import shared_task
+
+@shared_task
+def generate_property_image_derivatives_task(image_id):
+    from common.images import generate_derivatives
+    from .models import PropertyImage
+
+    image = PropertyImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return None
+    return generate_derivatives(image)
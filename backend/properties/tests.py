@@ -1,7 +1,25 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
 from django.contrib.auth import get_user_model
-from .models import Property, Unit
+from rest_framework.test import APIClient
+from .models import Property, Unit, PropertyImage, Document
+from .serializers import PropertyImageSerializer
+from bookings.models import Booking
+from search import autocomplete
+from search.models import SearchEntry
+from common.images import generate_derivatives
+from common.storage import vault_storage
+from common.cache import public_cache_stats
+from django.core.cache import cache
 from decimal import Decimal
+from datetime import date
 
 User = get_user_model()
 
@@ -41,3 +59,508 @@ class PropertyModelTest(TestCase):
     def test_string_representation(self):
         self.assertEqual(str(self.property), 'Sunset Villa')
         self.assertEqual(str(self.unit), 'Sunset Villa - 101')
+
+
+class UnitAvailabilitySearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.property = Property.objects.create(owner=self.landlord, title='Harbor View', address='1 Pier Rd')
+        self.booked = Unit.objects.create(
+            property=self.property, title='Booked', unit_number='1', description='', base_price=Decimal('100.00'),
+            turnover_buffer_hours=0
+        )
+        self.buffered = Unit.objects.create(
+            property=self.property, title='Buffered', unit_number='2', description='', base_price=Decimal('100.00'),
+            turnover_buffer_hours=48
+        )
+        self.free = Unit.objects.create(
+            property=self.property, title='Free', unit_number='3', description='', base_price=Decimal('300.00'),
+            turnover_buffer_hours=48
+        )
+        # Both end the day before the searched range starts
+        for unit in (self.booked, self.buffered):
+            Booking.objects.create(
+                unit=unit, tenant=self.tenant, start_date=date(2026, 3, 1), end_date=date(2026, 3, 10),
+                status='confirmed'
+            )
+
+    def search(self, **params):
+        response = self.client.get('/api/v1/units/available/', params)
+        self.assertEqual(response.status_code, 200)
+        return {unit['id'] for unit in response.data['results']}
+
+    def test_buffer_applied_per_unit(self):
+        ids = self.search(start_date='2026-03-11', end_date='2026-03-15')
+        self.assertEqual(ids, {self.booked.id, self.free.id})
+
+    def test_overlap_excluded_and_filters_combined(self):
+        ids = self.search(start_date='2026-03-05', end_date='2026-03-15', max_price='200')
+        self.assertEqual(ids, set())
+        ids = self.search(start_date='2026-03-05', end_date='2026-03-15', search='Free')
+        self.assertEqual(ids, {self.free.id})
+
+    def test_missing_dates(self):
+        response = self.client.get('/api/v1/units/available/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_calendar_runs(self):
+        response = self.client.get(
+            f'/api/v1/units/{self.buffered.id}/calendar/', {'start_date': '2026-02-25', 'days': 20}
+        )
+        self.assertEqual(response.status_code, 200)
+        # 2 free, 2 buffer, 9 booked (Mar 1-9), 2 buffer, 5 free
+        self.assertEqual(response.data['runs'], [['0', 2], ['2', 2], ['1', 9], ['2', 2], ['0', 5]])
+
+        cached = self.client.get(
+            f'/api/v1/units/{self.buffered.id}/calendar/', {'start_date': '2026-02-25', 'days': 20},
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(cached.status_code, 304)
+
+        Booking.objects.create(
+            unit=self.buffered, tenant=self.tenant, start_date=date(2026, 3, 14), end_date=date(2026, 3, 16)
+        )
+        refreshed = self.client.get(
+            f'/api/v1/units/{self.buffered.id}/calendar/', {'start_date': '2026-02-25', 'days': 20, 'encoding': 'string'},
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.data['calendar'], '00221111111112222112')
+
+    def test_batch_quote(self):
+        response = self.client.post('/api/v1/units/quote/', {
+            'units': [self.booked.id, self.free.id, 0],
+            'ranges': [
+                {'start_date': '2026-03-02', 'end_date': '2026-03-04'},
+                {'start_date': '2026-05-31', 'end_date': '2026-06-02'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        totals = [(quote['unit'], str(quote['total'])) for quote in response.data]
+        self.assertEqual(totals, [
+            (self.booked.id, '200.00'), (self.booked.id, '220.00'),
+            (self.free.id, '600.00'), (self.free.id, '660.00'),
+        ])
+
+    def test_batch_quote_validates_ranges(self):
+        response = self.client.post('/api/v1/units/quote/', {
+            'units': [self.free.id], 'ranges': [{'start_date': '2026-03-04', 'end_date': '2026-03-02'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        # Stays longer than the calendar window are refused before anything is priced
+        with patch('properties.views.quote_units') as quote_units:
+            response = self.client.post('/api/v1/units/quote/', {
+                'units': [self.free.id], 'ranges': [{'start_date': '0001-01-01', 'end_date': '9999-12-31'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        quote_units.assert_not_called()
+
+
+class UnitFeatureFilterTest(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        prop = Property.objects.create(owner=landlord, title='Resort', address='1 Beach', description='-')
+
+        def unit(number, features):
+            return Unit.objects.create(
+                property=prop, title=f'Unit {number}', unit_number=number, description='',
+                base_price=Decimal('100.00'), features=features
+            )
+        self.studio = unit('1', {'pool': True, 'bedrooms': 1, 'view': 'garden'})
+        self.family = unit('2', {'pool': True, 'parking': True, 'bedrooms': 3})
+        self.loft = unit('3', {'parking': True, 'pool': False, 'bedrooms': 2})
+        self.client = APIClient()
+
+    def ids(self, query):
+        response = self.client.get(f'/api/v1/units/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {unit['id'] for unit in response.data['results']}
+
+    def test_side_table_follows_saves(self):
+        self.assertEqual(
+            set(self.studio.feature_rows.values_list('key', 'value')), {('pool', None), ('bedrooms', 1.0)}
+        )
+        self.studio.features = {'wifi': True}
+        self.studio.save()
+        self.assertEqual(list(self.studio.feature_rows.values_list('key', flat=True)), ['wifi'])
+
+    def test_flag_and_range_filters(self):
+        self.assertEqual(self.ids('features=pool'), {self.studio.id, self.family.id})
+        self.assertEqual(self.ids('features=pool,parking'), {self.family.id})
+        self.assertEqual(self.ids('bedrooms>=2'), {self.family.id, self.loft.id})
+        self.assertEqual(self.ids('bedrooms<2'), {self.studio.id})
+        self.assertEqual(self.ids('features=parking&bedrooms<=2'), {self.loft.id})
+        self.assertEqual(self.client.get('/api/v1/units/?bedrooms>=two').status_code, 400)
+
+    def test_facets_in_the_same_response(self):
+        response = self.client.get('/api/v1/units/?features=pool&facets=1')
+        self.assertEqual(response.data['facets'], {
+            'amenities': {'parking': 1, 'pool': 2},
+            'numeric': {'bedrooms': {'1': 1, '3': 1}},
+        })
+        self.assertNotIn('facets', self.client.get('/api/v1/units/').data)
+
+class PublicCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        self.property = Property.objects.create(owner=self.landlord, title='Resort', address='1 Beach', description='-')
+        self.unit = Unit.objects.create(
+            property=self.property, title='Bungalow', unit_number='1', description='', base_price=Decimal('100.00')
+        )
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_reads_are_cached_per_normalized_query(self):
+        self.assertEqual(self.get('/api/v1/units/', is_active='true', page=1)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get('/api/v1/units/', page=1, is_active='true')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['title'], 'Bungalow')
+        self.assertEqual(public_cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+        self.client.force_authenticate(user=self.landlord)
+        self.assertNotIn('X-Cache', self.get('/api/v1/units/', page=1, is_active='true'))
+
+    def test_saves_invalidate_only_what_they_touch(self):
+        other = Unit.objects.create(
+            property=self.property, title='Villa', unit_number='2', description='', base_price=Decimal('200.00')
+        )
+        unit_url, other_url = f'/api/v1/units/{self.unit.pk}/', f'/api/v1/units/{other.pk}/'
+        available = {'start_date': '2026-05-01', 'end_date': '2026-05-05'}
+        for url, params in ((unit_url, {}), (other_url, {}), ('/api/v1/units/available/', available)):
+            self.get(url, **params)
+
+        self.unit.title = 'Beach Bungalow'
+        self.unit.save()
+        self.assertEqual(self.get(unit_url).data['title'], 'Beach Bungalow')
+        self.assertEqual(self.get(other_url)['X-Cache'], 'HIT')
+
+        Booking.objects.create(
+            unit=other, tenant=self.tenant, start_date=date(2026, 5, 2), end_date=date(2026, 5, 4), status='confirmed'
+        )
+        self.assertEqual(self.get(other_url)['X-Cache'], 'HIT')
+        response = self.get('/api/v1/units/available/', **available)
+        self.assertEqual([unit['id'] for unit in response.data['results']], [self.unit.pk])
+
+        # Units show their property's title
+        self.property.title = 'Grand Resort'
+        self.property.save()
+        self.assertEqual(self.get(other_url).data['property_title'], 'Grand Resort')
+
+class UnitBulkUpsertTest(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        other = User.objects.create_user(username='other', password='pass', role='landlord')
+        self.tower = Property.objects.create(owner=self.landlord, title='Tower', address='1 High St', description='-')
+        self.foreign = Property.objects.create(owner=other, title='Elsewhere', address='2 Low St', description='-')
+        self.existing = Unit.objects.create(
+            property=self.tower, title='Old', unit_number='101', description='', base_price=Decimal('90.00')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def test_bulk_creates_updates_and_reports_row_errors(self):
+        rows = [
+            {'property': self.tower.id, 'unit_number': '101', 'title': 'Renovated', 'base_price': '120.00'},
+            {'property': self.tower.id, 'unit_number': '102', 'title': 'Corner', 'base_price': '150', 'features': {'balcony': True}},
+            {'property': self.foreign.id, 'unit_number': '1', 'title': 'Nope', 'base_price': '10'},
+            {'property': self.tower.id, 'unit_number': '102', 'title': 'Twice', 'base_price': '10'},
+            {'property': self.tower.id, 'unit_number': '103', 'base_price': 'cheap'},
+        ]
+        # A dry run reports what would happen and writes nothing; "false" is not a dry run
+        response = self.client.post('/api/v1/units/bulk/', {'units': rows, 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['dry_run'], response.data['created'], response.data['updated']), (True, 1, 1))
+        self.assertFalse(Unit.objects.filter(unit_number='102').exists())
+
+        # A fixed number of queries, however many rows
+        with self.assertNumQueries(14):
+            response = self.client.post('/api/v1/units/bulk/', {'units': rows, 'dry_run': 'false'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+        self.assertEqual(response.data['errors'][0]['errors'], ['property: not your property.'])
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.title, self.existing.base_price), ('Renovated', Decimal('120.00')))
+        corner = Unit.objects.get(property=self.tower, unit_number='102')
+        # Side effects of save() are replayed: feature side table and search index
+        self.assertEqual(list(corner.feature_rows.values_list('key', flat=True)), ['balcony'])
+        self.assertTrue(SearchEntry.objects.filter(kind='unit', object_id=corner.id).exists())
+
+    def test_bulk_buffer_change_moves_blocked_until(self):
+        tenant = User.objects.create_user(username='tenant', password='pass', role='tenant')
+        booking = Booking.objects.create(
+            unit=self.existing, tenant=tenant, start_date=date(2026, 5, 1), end_date=date(2026, 5, 4), status='confirmed'
+        )
+        self.assertEqual(booking.blocked_until, date(2026, 5, 5))
+        response = self.client.post(
+            '/api/v1/units/bulk/', {'units': [{'id': self.existing.id, 'turnover_buffer_hours': 72}]}, format='json'
+        )
+        self.assertEqual((response.data['updated'], response.data['buffer_clashes']), (1, []))
+        booking.refresh_from_db()
+        self.assertEqual(booking.blocked_until, date(2026, 5, 7))
+
+    def test_csv_import(self):
+        content = (
+            "id,property,unit_number,title,base_price,features,is_active\n"
+            f"{self.existing.id},,,Penthouse,300,\"{{\"\"pool\"\": true}}\",no\n"
+            f",{self.tower.id},201,Studio,80,,yes\n"
+        )
+        upload = SimpleUploadedFile('units.csv', content.encode(), content_type='text/csv')
+        response = self.client.post('/api/v1/units/import_csv/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['errors']), (1, 1, []))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.title, self.existing.is_active, self.existing.features), ('Penthouse', False, {'pool': True}))
+        self.assertEqual(self.existing.unit_number, '101')
+
+        # Re-importing the same rows changes nothing
+        upload = SimpleUploadedFile('units.csv', content.encode(), content_type='text/csv')
+        response = self.client.post('/api/v1/units/import_csv/', {'file': upload}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['unchanged']), (0, 0, 2))
+
+
+class GlobalSearchTest(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.other = User.objects.create_user(username='other', password='pass', role='landlord')
+        self.tenant = User.objects.create_user(
+            username='jdoe', password='pass', role='tenant', first_name='Jane', last_name='Sunderland'
+        )
+        self.villa = Property.objects.create(owner=self.landlord, title='Sunset Villa', address='1 Ocean Drive', description='-')
+        self.unit = Unit.objects.create(property=self.villa, title='Garden Suite', unit_number='G1', base_price=Decimal('100.00'))
+        Property.objects.create(owner=self.other, title='Sunny Lofts', address='9 Hill Road', description='-')
+        self.client = APIClient()
+        autocomplete._indexes.clear()
+
+    def test_cold_scope_is_built_once_per_version(self):
+        # Another request in this process is already loading the landlord's scopes
+        versions = autocomplete.scope_versions(autocomplete.user_scopes(self.landlord))
+        autocomplete._building.update(versions.items())
+        try:
+            with self.assertNumQueries(1):
+                self.assertEqual({r['title'] for r in self.search(self.landlord, 'sunset')}, {'Sunset Villa', 'Garden Suite'})
+            self.assertEqual(autocomplete._indexes, {})
+        finally:
+            autocomplete._building.clear()
+
+    def search(self, user, q):
+        self.client.force_authenticate(user=user)
+        return self.client.get('/api/v1/search/', {'q': q}).data
+
+    def test_prefix_search_is_ranked_and_scoped(self):
+        Booking.objects.create(
+            unit=self.unit, tenant=self.tenant, start_date=date(2026, 3, 1), end_date=date(2026, 3, 4), status='confirmed'
+        )
+        # Cold: the database search answers, then the landlord's two scopes (own listings,
+        # their tenants) are indexed, one query each
+        with self.assertNumQueries(3):
+            results = self.search(self.landlord, 'sun')
+        self.assertEqual(
+            {(r['type'], r['title']) for r in results},
+            {('property', 'Sunset Villa'), ('unit', 'Garden Suite'), ('tenant', 'Jane Sunderland')}
+        )
+        # Addresses are indexed too, and every word has to match
+        self.assertEqual([r['id'] for r in self.search(self.landlord, 'ocean gard')], [self.unit.id])
+        # Another landlord's tenants and properties stay hidden
+        self.assertEqual([r['title'] for r in self.search(self.other, 'sun')], ['Sunny Lofts'])
+
+    def test_index_follows_changes(self):
+        self.villa.title = 'Moonrise Villa'
+        self.villa.save()
+        results = self.search(self.landlord, 'moonrise')
+        self.assertEqual({r['type'] for r in results}, {'property', 'unit'})
+        self.assertEqual(results[[r['type'] for r in results].index('unit')]['subtitle'], 'Moonrise Villa - G1')
+
+        self.unit.delete()
+        self.assertEqual([r['type'] for r in self.search(self.landlord, 'moonrise')], ['property'])
+
+    def test_warm_index_answers_from_memory(self):
+        self.search(self.landlord, 'sun')
+        with self.assertNumQueries(0):
+            results = self.search(self.landlord, 'garden su')
+        self.assertEqual([(r['type'], r['id']) for r in results], [('unit', self.unit.id)])
+        # Title prefix matches rank ahead of address/other matches
+        Unit.objects.create(property=self.villa, title='Sunroom', unit_number='S1', base_price=Decimal('90.00'))
+        # The save invalidated only the landlord's own scope: one search, one rebuild
+        with self.assertNumQueries(2):
+            self.assertEqual([r['title'] for r in self.search(self.landlord, 'sunr')], ['Sunroom'])
+        titles = [r['title'] for r in self.search(self.landlord, 'sun')]
+        self.assertEqual(titles, ['Sunset Villa', 'Sunroom', 'Garden Suite'])
+
+    def test_tenants_share_the_public_index(self):
+        other_tenant = User.objects.create_user(username='guest', password='pass', role='tenant')
+        self.search(self.tenant, 'sun')
+        # Only the second tenant's own (document) scope is cold: one search, one build
+        with self.assertNumQueries(2):
+            results = self.search(other_tenant, 'sun')
+        self.assertEqual({r['title'] for r in results}, {'Sunny Lofts', 'Sunset Villa', 'Garden Suite'})
+
+        # A booking only touches its landlord's tenant scope: tenants and the other landlord stay warm
+        self.search(self.landlord, 'sun')
+        self.search(self.other, 'sun')
+        Booking.objects.create(
+            unit=self.unit, tenant=self.tenant, start_date=date(2026, 3, 1), end_date=date(2026, 3, 4), status='confirmed'
+        )
+        with self.assertNumQueries(0):
+            self.search(other_tenant, 'sun')
+            self.search(self.other, 'sun')
+        with self.assertNumQueries(2):
+            results = self.search(self.landlord, 'jane')
+        self.assertEqual([r['type'] for r in results], ['tenant'])
+
+
+def _jpeg(width, height, color='teal'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'JPEG')
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageDerivativeTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        self.property = Property.objects.create(owner=landlord, title='Villa', address='1 Road', description='-')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_upload_enqueues_generation_after_commit(self):
+        with patch('properties.signals.generate_property_image_derivatives_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                image = PropertyImage.objects.create(property=self.property, image=_jpeg(800, 600))
+            delay.assert_called_once_with(image.pk)
+            # Writing the derived fields does not enqueue again
+            with self.captureOnCommitCallbacks(execute=True):
+                generate_derivatives(image)
+            delay.assert_called_once()
+
+    def test_derivatives_are_sized_and_shared_by_content(self):
+        image = PropertyImage.objects.create(property=self.property, image=_jpeg(1600, 1200))
+        derivatives = generate_derivatives(image)
+        self.assertEqual(sorted(derivatives, key=int), ['320', '640', '1280'])
+        with default_storage.open(derivatives['640']) as f:
+            self.assertEqual(Image.open(f).size, (640, 480))
+
+        # Same bytes uploaded again: the stored derivatives are reused, nothing new is written
+        duplicate = PropertyImage.objects.create(property=self.property, image=_jpeg(1600, 1200))
+        with patch('common.images.default_storage.save') as save:
+            self.assertEqual(generate_derivatives(duplicate), derivatives)
+        save.assert_not_called()
+
+        srcset = PropertyImageSerializer(duplicate).data['srcset']
+        self.assertEqual(srcset.split(', ')[0], f"/media/{derivatives['320']} 320w")
+        self.assertTrue(srcset.endswith('1280w'))
+
+    def test_small_images_are_not_upscaled(self):
+        image = PropertyImage.objects.create(property=self.property, image=_jpeg(500, 400, 'red'))
+        derivatives = generate_derivatives(image)
+        self.assertEqual(list(derivatives), ['320'])
+
+
+class DocumentDownloadTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, SENDFILE_BACKEND='')
+        self.settings_override.enable()
+        self.landlord = User.objects.create_user(username='landlord', password='pass', role='landlord')
+        prop = Property.objects.create(owner=self.landlord, title='Villa', address='1 Road', description='-')
+        self.content = bytes(range(256)) * 40
+        self.doc = Document.objects.create(
+            property=prop, title='Lease', category='lease',
+            file=SimpleUploadedFile('lease.pdf', self.content, content_type='application/pdf'),
+        )
+        self.url = f'/api/v1/properties/documents/{self.doc.pk}/download/'
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.landlord)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_edits_change_the_api_etags(self):
+        list_url, detail_url = '/api/v1/properties/documents/', f'/api/v1/properties/documents/{self.doc.pk}/'
+        list_etag, detail_etag = self.client.get(list_url)['ETag'], self.client.get(detail_url)['ETag']
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 304)
+
+        response = self.client.patch(detail_url, {'title': 'Signed lease'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_full_download_and_etag(self):
+        self.assertEqual(len(self.doc.content_hash), 64)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], f'"{self.doc.content_hash}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('filename="lease.pdf"', response['Content-Disposition'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.doc.content_hash}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+        # A stale If-Range gets the whole (changed) file instead of a range
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_proxy_offload(self):
+        # Clients cannot ask for offload themselves
+        response = self.client.get(self.url, HTTP_X_SENDFILE_TYPE='X-Sendfile')
+        self.assertFalse(response.has_header('X-Sendfile'))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        with override_settings(SENDFILE_BACKEND='X-Accel-Redirect'):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.doc.file.name}')
+            self.assertEqual(response.content, b'')
+
+            other = User.objects.create_user(username='other', password='pass', role='landlord')
+            self.client.force_authenticate(user=other)
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_identical_files_share_one_blob(self):
+        self.assertEqual(self.doc.file.name, f'vault/{self.doc.content_hash[:2]}/{self.doc.content_hash}.pdf')
+        copy = Document.objects.create(
+            property=self.doc.property, title='Lease (unit 2)', category='lease',
+            file=SimpleUploadedFile('lease-2.pdf', self.content, content_type='application/pdf'),
+        )
+        self.assertEqual(copy.file.name, self.doc.file.name)
+        self.assertEqual(copy.filename, 'lease-2.pdf')
+        self.assertEqual(list(vault_storage.blobs()), [self.doc.file.name])
+
+        # Still referenced by the copy after the original goes away
+        self.doc.delete()
+        call_command('gc_vault', grace_minutes=0, stdout=StringIO())
+        self.assertTrue(vault_storage.exists(copy.file.name))
+
+        copy.delete()
+        call_command('gc_vault', stdout=StringIO())
+        self.assertTrue(vault_storage.exists(copy.file.name))  # within the grace period
+        call_command('gc_vault', grace_minutes=0, stdout=StringIO())
+        self.assertFalse(vault_storage.exists(copy.file.name))
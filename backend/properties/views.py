@@ -1,17 +1,25 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.http import FileResponse
+from django.db.models import Q
 from .models import Property, Unit, Document
+from .features import parse_feature_filters, filter_by_features, feature_facets
+from .services import upsert_units
 from .serializers import PropertySerializer, UnitSerializer, DocumentSerializer
 from .permissions import IsOwnerOrReadOnly, IsLandlordOrReadOnly
-from bookings.services import is_unit_available
+from common.files import download_response
+from common.views import ConditionalGetMixin, PublicCacheMixin, SparseFieldsetViewMixin
+from search.autocomplete import autocomplete
+from bookings.services import is_unit_available, filter_available_units, get_occupancy_calendar, quote_units
 from datetime import datetime
+from django.utils import timezone
+import csv
+import hashlib
+import io
 
 from rest_framework.views import APIView
-from django.contrib.auth import get_user_model
-
-User = get_user_model()
 
 class GlobalSearchView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -21,58 +29,10 @@ class GlobalSearchView(APIView):
         if len(query) < 2:
             return Response([])
 
-        results = []
-        user = request.user
+        # Answered from the user's in-memory prefix index once it is warm
+        return Response(autocomplete(request.user, query))
 
-        # 1. Search Properties (Owned by user if landlord, or all if staff)
-        prop_qs = Property.objects.filter(title__icontains=query)
-        if user.role == 'landlord':
-            prop_qs = prop_qs.filter(owner=user)
-        
-        for p in prop_qs[:5]:
-            results.append({
-                'type': 'property',
-                'id': p.id,
-                'title': p.title,
-                'subtitle': p.address,
-                'url': f'/landlord-dashboard' # Or a specific prop page
-            })
-
-        # 2. Search Units
-        unit_qs = Unit.objects.filter(Q(title__icontains=query) | Q(unit_number__icontains=query))
-        if user.role == 'landlord':
-            unit_qs = unit_qs.filter(property__owner=user)
-        
-        for u in unit_qs[:5]:
-            results.append({
-                'type': 'unit',
-                'id': u.id,
-                'title': u.title,
-                'subtitle': f"{u.property.title} - {u.unit_number}",
-                'url': f'/unit/{u.id}'
-            })
-
-        # 3. Search Tenants (Only for Landlords/Admin)
-        if user.role in ['landlord', 'admin']:
-            tenant_qs = User.objects.filter(role='tenant').filter(
-                Q(username__icontains=query) | Q(first_name__icontains=query) | Q(last_name__icontains=query)
-            )
-            # If landlord, only show tenants that have bookings in their properties
-            if user.role == 'landlord':
-                tenant_qs = tenant_qs.filter(bookings__unit__property__owner=user).distinct()
-            
-            for t in tenant_qs[:5]:
-                results.append({
-                    'type': 'tenant',
-                    'id': t.id,
-                    'title': f"{t.first_name} {t.last_name}",
-                    'subtitle': t.email,
-                    'url': f'/landlord-dashboard' # Can be expanded to tenant detail
-                })
-
-        return Response(results)
-
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -81,22 +41,35 @@ class DocumentViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role == 'admin':
             return Document.objects.all()
-        # Landlord: docs for properties they own
+        # Landlord: docs for properties they own, plus their own generated reports
         if user.role == 'landlord':
-            return Document.objects.filter(property__owner=user)
-        # Tenant: For now, return empty or specific shared docs (logic can be expanded)
-        return Document.objects.none()
+            return Document.objects.filter(Q(property__owner=user) | Q(owner=user))
+        # Tenant: their own generated reports (shared docs logic can be expanded)
+        return Document.objects.filter(owner=user)
 
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         doc = self.get_object()
-        handle = doc.file.open()
-        return FileResponse(handle, as_attachment=True, filename=doc.file.name.split('/')[-1])
-
-class PropertyViewSet(viewsets.ModelViewSet):
-    queryset = Property.objects.all().prefetch_related('units', 'images')
+        if not doc.content_hash:
+            # Documents stored before hashing was introduced
+            doc.save(update_fields=['content_hash'])
+        return download_response(request, doc.file, doc.download_name(), doc.content_hash)
+
+class PropertyViewSet(PublicCacheMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Property.objects.all()
+    public_cache_name = 'property'
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsLandlordOrReadOnly, IsOwnerOrReadOnly]
+    field_select_related = {
+        'owner_details': ['owner'],
+    }
+    field_prefetch_related = {
+        'units': ['units__images'],
+        'images': ['images'],
+    }
+
+    def get_queryset(self):
+        return self.with_requested_relations(super().get_queryset())
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -107,7 +80,12 @@ class PropertyViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(properties, many=True)
         return Response(serializer.data)
 
-class UnitViewSet(viewsets.ModelViewSet):
+class UnitViewSet(PublicCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+
+    public_cache_name = 'unit'
+
+    # Units render their property's title
+    conditional_related_fields = ('property__updated_at',)
 
     queryset = Unit.objects.all().select_related('property').prefetch_related('images')
 
@@ -141,24 +119,176 @@ class UnitViewSet(viewsets.ModelViewSet):
 
             queryset = queryset.filter(base_price__lte=max_price)
 
-            
+        # Amenity filters: ?features=pool,parking and numeric ranges such as ?bedrooms>=2
+        try:
+            flags, ranges = parse_feature_filters(self.request.query_params)
+        except ValueError as e:
+            raise ParseError(str(e))
+        if flags or ranges:
+            queryset = filter_by_features(queryset, flags, ranges)
 
         return queryset
 
-    @action(detail=True, methods=['get'])
-    def check_availability(self, request, pk=None):
-        unit = self.get_object()
+    def perform_update(self, serializer):
+        serializer.save()
+        self._buffer_clashes = getattr(serializer.instance, 'buffer_clashes', [])
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        # Bookings whose blocked_until could not follow a raised turnover buffer (PostgreSQL
+        # exclusion constraint); they keep the old buffer until the overlap is resolved
+        response.data['buffer_clashes'] = self._buffer_clashes
+        return response
+
+    def paginate_queryset(self, queryset):
+        self._paginated_queryset = queryset
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        """With ?facets=1 a page also carries feature counts over all matching units."""
+        response = super().get_paginated_response(data)
+        if self.request.query_params.get('facets') in ('1', 'true'):
+            response.data['facets'] = feature_facets(self._paginated_queryset)
+        return response
+
+    def _parse_date_range(self, request):
         start_date_str = request.query_params.get('start_date')
         end_date_str = request.query_params.get('end_date')
 
         if not start_date_str or not end_date_str:
-            return Response({"error": "Missing dates"}, status=400)
+            return None, None, Response({"error": "Missing dates"}, status=400)
 
         try:
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
         except ValueError:
-            return Response({"error": "Invalid date format"}, status=400)
+            return None, None, Response({"error": "Invalid date format"}, status=400)
+
+        return start_date, end_date, None
+
+    @action(detail=True, methods=['get'])
+    def check_availability(self, request, pk=None):
+        unit = self.get_object()
+        start_date, end_date, error = self._parse_date_range(request)
+        if error:
+            return error
 
         available = is_unit_available(unit, start_date, end_date)
         return Response({"available": available})
+
+    @action(detail=True, methods=['get'])
+    def calendar(self, request, pk=None):
+        """
+        Per-day occupancy (free / booked / buffer) for a window, default 365 days from today.
+        Clients can revalidate with If-None-Match; the ETag changes only when the unit's bookings do.
+        """
+        unit = self.get_object()
+
+        try:
+            start_date_str = request.query_params.get('start_date')
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else timezone.now().date()
+            days = int(request.query_params.get('days', 365))
+        except ValueError:
+            return Response({"error": "Invalid date format"}, status=400)
+
+        if not 1 <= days <= 731:
+            return Response({"error": "days must be between 1 and 731"}, status=400)
+
+        run_length = request.query_params.get('encoding', 'rle') != 'string'
+        calendar = get_occupancy_calendar(unit, start_date, days, run_length=run_length)
+
+        etag = '"%s"' % hashlib.md5(f"{calendar['version']}:{start_date}:{days}:{run_length}".encode()).hexdigest()
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=304)
+        else:
+            response = Response(calendar)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    MAX_BULK_ROWS = 20000
+
+    def _upsert(self, request, rows, dry_run):
+        if len(rows) > self.MAX_BULK_ROWS:
+            return Response({"detail": f"At most {self.MAX_BULK_ROWS} rows per request."}, status=400)
+        report = upsert_units(rows, owner=None if request.user.role == 'admin' else request.user, dry_run=dry_run)
+        return Response(report, status=201 if report['created'] and not dry_run else 200)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Creates or updates many units: {"units": [...], "dry_run": false}. A row with an id, or
+        with the property and unit_number of an existing unit, updates it; other rows create units.
+        """
+        rows = request.data.get('units')
+        if not isinstance(rows, list):
+            return Response({"detail": "'units' must be a list."}, status=400)
+        return self._upsert(request, rows, request.data.get('dry_run') in (True, '1', 'true'))
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """The bulk endpoint for a CSV upload ("file"); columns as in the JSON rows, features as JSON."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "Upload a CSV file as 'file'."}, status=400)
+        try:
+            rows = list(csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig')))
+        except (UnicodeDecodeError, csv.Error):
+            return Response({"detail": "The file is not a readable UTF-8 CSV."}, status=400)
+        return self._upsert(request, rows, request.data.get('dry_run') in ('1', 'true'))
+
+    MAX_QUOTE_NIGHTS = 731
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
+    def quote(self, request):
+        """
+        Prices many units for one or more stays in a single call:
+        {"units": [1, 2, 3], "ranges": [{"start_date": "2026-07-01", "end_date": "2026-07-05"}]}
+        """
+        unit_ids = request.data.get('units')
+        ranges = request.data.get('ranges')
+        if not isinstance(unit_ids, list) or not isinstance(ranges, list) or not unit_ids or not ranges:
+            return Response({"error": "'units' and 'ranges' must be non-empty lists"}, status=400)
+        if len(unit_ids) > 200 or len(ranges) > 10:
+            return Response({"error": "At most 200 units and 10 ranges per request"}, status=400)
+
+        date_ranges = []
+        try:
+            for entry in ranges:
+                start_date = datetime.strptime(entry['start_date'], '%Y-%m-%d').date()
+                end_date = datetime.strptime(entry['end_date'], '%Y-%m-%d').date()
+                if start_date >= end_date:
+                    return Response({"error": "End date must be after start date"}, status=400)
+                # Same window as the calendar; longer stays would compile rate tables for every year in between
+                if (end_date - start_date).days > self.MAX_QUOTE_NIGHTS:
+                    return Response({"error": f"At most {self.MAX_QUOTE_NIGHTS} nights per range"}, status=400)
+                date_ranges.append((start_date, end_date))
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "Invalid date format"}, status=400)
+
+        try:
+            units = list(Unit.objects.filter(pk__in=unit_ids, is_active=True).order_by('pk'))
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid unit id"}, status=400)
+
+        return Response(quote_units(units, date_ranges))
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """Units free for start_date..end_date, honouring the usual list filters and search."""
+        start_date, end_date, error = self._parse_date_range(request)
+        if error:
+            return error
+
+        def render():
+            queryset = filter_available_units(self.filter_queryset(self.get_queryset()), start_date, end_date)
+
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+        return self.public_cached(request, ['listings', 'availability'], render)
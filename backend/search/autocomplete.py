@@ -0,0 +1,201 @@
+"""
+In-memory prefix indexes for Omnisearch autocomplete.
+
+Search entries are split into scopes that are indexed separately: 'public' (every property
+and unit, one index shared by all tenants), 'owner:<id>' (a user's own properties, units and
+documents) and 'tenants:<landlord id>' (the tenants who booked with that landlord). A user's
+view is the union of a few scopes, e.g. public + owner for a tenant. Each scope is loaded
+once (one query) into a sorted array of (token, entry) pairs, so a keystroke is a bisect plus
+a short scan per scope instead of a database round trip. Until a scope is loaded, its users
+are answered by the database search.
+
+Indexes live in a per-process LRU, keyed by scope and by that scope's version in the Django
+cache. Signals bump only the scopes a change touches, so a booking rebuilds one landlord's
+tenant index and nothing else; a global generation, also part of every version, is bumped
+for bulk rebuilds.
+"""
+from bisect import bisect_left
+from collections import OrderedDict
+import re
+import threading
+import unicodedata
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import SearchEntry
+
+VERSION_KEY_PREFIX = 'search:index_version'
+GLOBAL_SCOPE = 'global'
+PUBLIC_SCOPE = 'public'
+MAX_INDEXED_SCOPES = 512
+# Larger scopes are not worth holding in memory; users who need one use the database search
+MAX_ENTRIES_PER_INDEX = 20000
+RESULT_LIMIT = 15
+KIND_ORDER = {'property': 0, 'unit': 1, 'tenant': 2, 'document': 3}
+
+_indexes = OrderedDict()
+# (scope, version) pairs some request in this process is already loading
+_building = set()
+_lock = threading.Lock()
+
+
+def owner_scope(user_id):
+    return f'owner:{user_id}'
+
+
+def tenants_scope(landlord_id):
+    return f'tenants:{landlord_id}'
+
+
+def user_scopes(user):
+    """The scopes whose union is what the user may see (see index.visible_to); None for admins."""
+    if user.role == 'admin':
+        return None
+    if user.role == 'landlord':
+        return [owner_scope(user.pk), tenants_scope(user.pk)]
+    return [PUBLIC_SCOPE, owner_scope(user.pk)]
+
+
+def _scope_filter(scope):
+    if scope == PUBLIC_SCOPE:
+        return Q(kind__in=('property', 'unit'))
+    name, user_id = scope.split(':')
+    if name == 'owner':
+        return Q(kind__in=('property', 'unit', 'document'), owner_id=user_id)
+    from bookings.models import Booking
+    tenants = Booking.objects.filter(unit__property__owner_id=user_id).values('tenant_id')
+    return Q(kind='tenant', object_id__in=tenants)
+
+
+def _version_key(scope):
+    return f'{VERSION_KEY_PREFIX}:{scope}'
+
+
+def scope_versions(scopes):
+    keys = [_version_key(scope) for scope in (GLOBAL_SCOPE, *scopes)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, timeout=None)
+            versions[key] = cache.get(key, 1)
+    generation = versions[keys[0]]
+    return {scope: (generation, versions[key]) for scope, key in zip(scopes, keys[1:])}
+
+
+def invalidate_autocomplete(*scopes):
+    """Called when searchable data changes; without scopes, every index is rebuilt."""
+    for scope in scopes or (GLOBAL_SCOPE,):
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, timeout=None)
+
+
+def _tokens(text):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+    return re.findall(r'\w+', text)
+
+
+class PrefixIndex:
+    def __init__(self, entries):
+        # entries: (kind, object_id, title, subtitle, url, content)
+        self.results = [
+            {'type': kind, 'id': object_id, 'title': title, 'subtitle': subtitle, 'url': url}
+            for kind, object_id, title, subtitle, url, _ in entries
+        ]
+        self.sort_keys = [
+            (KIND_ORDER.get(kind, len(KIND_ORDER)), title.lower())
+            for kind, _, title, _, _, _ in entries
+        ]
+        self.titles = [' '.join(_tokens(title)) for _, _, title, _, _, _ in entries]
+        self.tokens = sorted(
+            {(token, position) for position, entry in enumerate(entries) for token in _tokens(entry[5])}
+        )
+        self.keys = [token for token, _ in self.tokens]
+
+    def _matching(self, prefix):
+        positions, i = set(), bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            positions.add(self.tokens[i][1])
+            i += 1
+        return positions
+
+    def ranked(self, query, limit=RESULT_LIMIT):
+        """[(rank key, result), ...] best first; rank keys are comparable across indexes."""
+        words = _tokens(query)
+        if not words:
+            return []
+        # Every word has to prefix-match some token of the entry
+        positions = self._matching(words[0])
+        for word in words[1:]:
+            positions &= self._matching(word)
+        phrase = ' '.join(words)
+        ranked = sorted(
+            (((not self.titles[p].startswith(phrase), self.sort_keys[p]), self.results[p]) for p in positions),
+            key=lambda item: item[0]
+        )
+        return ranked[:limit]
+
+    def lookup(self, query, limit=RESULT_LIMIT):
+        return [result for _, result in self.ranked(query, limit)]
+
+
+def _build_scope_index(scope, version):
+    """Loads a scope into memory; only the request that claimed the (scope, version) build runs it."""
+    try:
+        entries = list(
+            SearchEntry.objects.filter(_scope_filter(scope))
+            .values_list('kind', 'object_id', 'title', 'subtitle', 'url', 'content')[:MAX_ENTRIES_PER_INDEX + 1]
+        )
+        # A None index marks a scope too large to hold in memory
+        index = PrefixIndex(entries) if len(entries) <= MAX_ENTRIES_PER_INDEX else None
+        with _lock:
+            _indexes[scope] = (version, index)
+            _indexes.move_to_end(scope)
+            while len(_indexes) > MAX_INDEXED_SCOPES:
+                _indexes.popitem(last=False)
+    finally:
+        with _lock:
+            _building.discard((scope, version))
+
+
+def autocomplete(user, query, limit=RESULT_LIMIT):
+    """
+    Answers from the in-memory indexes of the user's scopes. While any of them is cold or stale
+    the database search answers instead, and the missing indexes are built after it: each
+    (scope, version) once per process, by whichever request claims it first. Admins, and users
+    with a scope too large to index, always get the database search.
+    """
+    from .index import search
+
+    scopes = user_scopes(user)
+    if scopes is None:
+        return search(user, query, limit)
+
+    indexes, claimed, cold = [], [], False
+    with _lock:
+        for scope, version in scope_versions(scopes).items():
+            entry = _indexes.get(scope)
+            if entry and entry[0] == version:
+                _indexes.move_to_end(scope)
+                indexes.append(entry[1])
+                continue
+            cold = True
+            if (scope, version) not in _building:
+                _building.add((scope, version))
+                claimed.append((scope, version))
+
+    if cold or None in indexes:
+        results = search(user, query, limit)
+        for scope, version in claimed:
+            _build_scope_index(scope, version)
+        return results
+
+    results, seen = [], set()
+    for _, result in sorted((item for index in indexes for item in index.ranked(query, limit)), key=lambda item: item[0]):
+        if (result['type'], result['id']) not in seen:
+            seen.add((result['type'], result['id']))
+            results.append(result)
+    return results[:limit]
@@ -0,0 +1,169 @@
+"""
+The global search index.
+
+SearchEntry rows are denormalized from properties, units, tenants and documents (signals keep
+them current, rebuild_search_index recreates them). Matching and ranking run in the database
+in one query: FTS5 with bm25 on SQLite, trigram word similarity plus full-text rank on
+PostgreSQL.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q
+
+from properties.models import Property, Unit, Document
+from .autocomplete import invalidate_autocomplete
+from .models import SearchEntry
+
+FTS_TABLE = 'search_searchentry_fts'
+RESULT_LIMIT = 15
+
+
+def _scope(queryset, ids):
+    return queryset if ids is None else queryset.filter(pk__in=ids)
+
+
+def _property_entries(ids):
+    return [
+        SearchEntry(
+            kind='property', object_id=prop.pk, owner_id=prop.owner_id,
+            title=prop.title, subtitle=prop.address, url='/landlord-dashboard',
+            content=f"{prop.title} {prop.address}",
+        )
+        for prop in _scope(Property.objects.all(), ids)
+    ]
+
+
+def _unit_entries(ids):
+    return [
+        SearchEntry(
+            kind='unit', object_id=unit.pk, owner_id=unit.property.owner_id,
+            title=unit.title, subtitle=f"{unit.property.title} - {unit.unit_number}", url=f'/unit/{unit.pk}',
+            content=f"{unit.title} {unit.unit_number} {unit.property.title} {unit.property.address}",
+        )
+        for unit in _scope(Unit.objects.select_related('property'), ids)
+    ]
+
+
+def _tenant_entries(ids):
+    return [
+        SearchEntry(
+            kind='tenant', object_id=user.pk, owner=None,
+            title=user.get_full_name() or user.username, subtitle=user.email, url='/landlord-dashboard',
+            content=f"{user.username} {user.first_name} {user.last_name} {user.email}",
+        )
+        for user in _scope(get_user_model().objects.filter(role='tenant'), ids)
+    ]
+
+
+def _document_entries(ids):
+    entries = []
+    for doc in _scope(Document.objects.select_related('property', 'unit__property'), ids):
+        prop = doc.property or (doc.unit.property if doc.unit else None)
+        entries.append(SearchEntry(
+            kind='document', object_id=doc.pk, owner_id=doc.owner_id or (prop.owner_id if prop else None),
+            title=doc.title, subtitle=f"{doc.get_category_display()}{f' - {prop.title}' if prop else ''}",
+            url='/landlord-dashboard',
+            content=f"{doc.title} {doc.get_category_display()} {prop.title if prop else ''}",
+        ))
+    return entries
+
+
+BUILDERS = {
+    'property': _property_entries,
+    'unit': _unit_entries,
+    'tenant': _tenant_entries,
+    'document': _document_entries,
+}
+
+
+def _owners(entries):
+    return {owner_id for owner_id in entries if owner_id is not None}
+
+
+@transaction.atomic
+def index_objects(kind, ids):
+    """
+    (Re)indexes the given objects of a kind; ids that no longer qualify are dropped.
+    Returns the ids of the owners whose entries were touched, before or after.
+    """
+    old = SearchEntry.objects.filter(kind=kind, object_id__in=ids)
+    owners = _owners(old.values_list('owner_id', flat=True))
+    old.delete()
+    entries = SearchEntry.objects.bulk_create(BUILDERS[kind](ids))
+    return owners | _owners(entry.owner_id for entry in entries)
+
+
+def remove_objects(kind, ids):
+    """Drops the objects' entries; returns the ids of their owners."""
+    entries = SearchEntry.objects.filter(kind=kind, object_id__in=ids)
+    owners = _owners(entries.values_list('owner_id', flat=True))
+    entries.delete()
+    return owners
+
+
+@transaction.atomic
+def rebuild_search_index():
+    SearchEntry.objects.all().delete()
+    count = 0
+    for build in BUILDERS.values():
+        count += len(SearchEntry.objects.bulk_create(build(None), batch_size=1000))
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    invalidate_autocomplete()
+    return count
+
+
+def visible_to(user):
+    # The union of the user's autocomplete scopes (see autocomplete.user_scopes)
+    if user.role == 'admin':
+        return Q()
+    if user.role == 'landlord':
+        from bookings.models import Booking
+        tenants = Booking.objects.filter(unit__property__owner=user).values('tenant_id')
+        return Q(kind__in=('property', 'unit', 'document'), owner=user) | Q(kind='tenant', object_id__in=tenants)
+    # Tenants: the public listings plus their own documents
+    return Q(kind__in=('property', 'unit')) | Q(kind='document', owner=user)
+
+
+def _fts_query(query):
+    # Every word must match, each as a prefix; quoting keeps FTS5 syntax characters literal
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def _match(queryset, query):
+    if connection.vendor == 'sqlite':
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return queryset.none()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = search_searchentry.id', f'{FTS_TABLE} MATCH %s'],
+            params=[fts_query],
+            select={'rank': f'{FTS_TABLE}.rank'},
+        ).order_by('rank')
+    if connection.vendor == 'postgresql':
+        return queryset.extra(
+            select={'rank': (
+                "GREATEST(word_similarity(%s, search_searchentry.content), "
+                "ts_rank(to_tsvector('simple', search_searchentry.content), plainto_tsquery('simple', %s)))"
+            )},
+            select_params=(query, query),
+            where=[
+                "(%s <%% search_searchentry.content "
+                "OR to_tsvector('simple', search_searchentry.content) @@ plainto_tsquery('simple', %s))"
+            ],
+            params=(query, query),
+        ).order_by('-rank')
+    return queryset.filter(content__icontains=query)
+
+
+def search(user, query, limit=RESULT_LIMIT):
+    """Ranked results visible to the user, in the shape Omnisearch renders."""
+    entries = _match(SearchEntry.objects.filter(visible_to(user)), query)[:limit]
+    return [
+        {'type': kind, 'id': object_id, 'title': title, 'subtitle': subtitle, 'url': url}
+        for kind, object_id, title, subtitle, url in entries.values_list('kind', 'object_id', 'title', 'subtitle', 'url')
+    ]
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from search.index import rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Recreates the global search index from properties, units, tenants and documents'
+
+    def handle(self, *args, **options):
+        entries = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt: {entries} entries."))
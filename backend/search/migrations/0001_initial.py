@@ -0,0 +1,118 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FTS_TABLE = 'search_searchentry_fts'
+
+
+def create_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # External-content FTS5 table kept in sync with search_searchentry by triggers
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(content, content='search_searchentry', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER search_searchentry_ai AFTER INSERT ON search_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER search_searchentry_ad AFTER DELETE ON search_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER search_searchentry_au AFTER UPDATE ON search_searchentry BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); "
+            f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX search_entry_trgm_idx ON search_searchentry USING gin (content gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX search_entry_fts_idx ON search_searchentry USING gin (to_tsvector('simple', content))"
+        )
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS search_searchentry_{trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS search_entry_trgm_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS search_entry_fts_idx")
+
+
+def backfill_entries(apps, schema_editor):
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    Property = apps.get_model('properties', 'Property')
+    Unit = apps.get_model('properties', 'Unit')
+    Document = apps.get_model('properties', 'Document')
+    User = apps.get_model('users', 'User')
+    categories = dict(Document._meta.get_field('category').choices)
+
+    entries = [
+        SearchEntry(kind='property', object_id=prop.pk, owner_id=prop.owner_id, title=prop.title,
+                    subtitle=prop.address, url='/landlord-dashboard', content=f"{prop.title} {prop.address}")
+        for prop in Property.objects.all()
+    ]
+    entries += [
+        SearchEntry(kind='unit', object_id=unit.pk, owner_id=unit.property.owner_id, title=unit.title,
+                    subtitle=f"{unit.property.title} - {unit.unit_number}", url=f'/unit/{unit.pk}',
+                    content=f"{unit.title} {unit.unit_number} {unit.property.title} {unit.property.address}")
+        for unit in Unit.objects.select_related('property')
+    ]
+    entries += [
+        SearchEntry(kind='tenant', object_id=user.pk, title=f"{user.first_name} {user.last_name}".strip() or user.username,
+                    subtitle=user.email, url='/landlord-dashboard',
+                    content=f"{user.username} {user.first_name} {user.last_name} {user.email}")
+        for user in User.objects.filter(role='tenant')
+    ]
+    for doc in Document.objects.select_related('property', 'unit__property'):
+        prop = doc.property or (doc.unit.property if doc.unit else None)
+        category = categories.get(doc.category, doc.category)
+        entries.append(SearchEntry(
+            kind='document', object_id=doc.pk, owner_id=doc.owner_id or (prop.owner_id if prop else None),
+            title=doc.title, subtitle=f"{category}{f' - {prop.title}' if prop else ''}", url='/landlord-dashboard',
+            content=f"{doc.title} {category} {prop.title if prop else ''}",
+        ))
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('properties', '0004_document_owner_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('property', 'Property'), ('unit', 'Unit'), ('tenant', 'Tenant'), ('document', 'Document')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('url', models.CharField(max_length=255)),
+                ('content', models.TextField()),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry'),
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
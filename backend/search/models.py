@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """
+    One searchable row per property, unit, tenant or document. `content` is what the
+    database-specific text index covers (FTS5 on SQLite, trigram + tsvector on PostgreSQL);
+    the other fields are what a result renders and who may see it.
+    """
+    KIND_CHOICES = (
+        ('property', 'Property'),
+        ('unit', 'Unit'),
+        ('tenant', 'Tenant'),
+        ('document', 'Document'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    # Landlord who owns the object; tenants have none and are scoped through bookings
+    owner = models.ForeignKey('users.User', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    url = models.CharField(max_length=255)
+    content = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_entry'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bookings.models import Booking
+from properties.models import Property, Unit, Document
+from .autocomplete import PUBLIC_SCOPE, invalidate_autocomplete, owner_scope, tenants_scope
+from .index import index_objects, remove_objects
+
+User = get_user_model()
+
+def _invalidate(owners, public=False):
+    scopes = [*([PUBLIC_SCOPE] if public else []), *(owner_scope(pk) for pk in owners)]
+    if scopes:
+        invalidate_autocomplete(*scopes)
+
+def _invalidate_tenants(landlord_ids):
+    landlord_ids = {pk for pk in landlord_ids if pk is not None}
+    if landlord_ids:
+        invalidate_autocomplete(*(tenants_scope(pk) for pk in landlord_ids))
+
+def _unit_owners(*unit_ids):
+    return Unit.objects.filter(pk__in=[pk for pk in unit_ids if pk]).values_list('property__owner_id', flat=True)
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, **kwargs):
+    owners = index_objects('property', [instance.pk])
+    # Units and documents render the property's title and inherit its owner
+    owners |= index_objects('unit', list(instance.units.values_list('pk', flat=True)))
+    owners |= index_objects('document', list(instance.documents.values_list('pk', flat=True)))
+    _invalidate(owners, public=True)
+
+@receiver(post_save, sender=Unit)
+def index_unit(sender, instance, **kwargs):
+    _invalidate(index_objects('unit', [instance.pk]), public=True)
+
+@receiver(post_save, sender=Document)
+def index_document(sender, instance, **kwargs):
+    _invalidate(index_objects('document', [instance.pk]))
+
+@receiver(post_save, sender=User)
+def index_tenant(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which nothing searchable depends on
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    # Also drops the entry of a user who is no longer a tenant
+    index_objects('tenant', [instance.pk])
+    # Tenant entries are seen by the landlords they booked with
+    _invalidate_tenants(Booking.objects.filter(tenant=instance).values_list('unit__property__owner_id', flat=True).distinct())
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    # A landlord's first booking with a tenant makes that tenant searchable for them
+    if created or instance.has_changed('unit'):
+        _invalidate_tenants(_unit_owners(instance.unit_id, None if created else instance.previous('unit')))
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    _invalidate_tenants(_unit_owners(instance.unit_id))
+
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=Unit)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=User)
+def remove_entry(sender, instance, **kwargs):
+    kind = {Property: 'property', Unit: 'unit', Document: 'document', User: 'tenant'}[sender]
+    # A deleted tenant's bookings went first in the cascade, which already invalidated their landlords
+    _invalidate(remove_objects(kind, [instance.pk]), public=kind in ('property', 'unit'))